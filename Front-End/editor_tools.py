@@ -44,16 +44,9 @@ class EditorTools:
 
         self.notify_layer_change()
 
-        if hasattr(self.app, "canvas"):
-            self.notify_layer_change()
         if hasattr(self.app, "_refresh_region_list"):
             self.app._refresh_region_list()
 
-
-            # Redraw overlays on the app's canvas
-            if hasattr(self.app, "canvas"):
-                self.notify_layer_change()
-
     def set_mode(self, mode: str):
         """Set interaction mode: 'select' or 'draw'."""
         if mode in ("select", "draw"):
@@ -62,7 +55,7 @@ class EditorTools:
 
     def on_mouse_down(self, event):
         canvas = event.widget
-        x, y = event.x, event.y
+        x, y = canvas.canvasx(event.x), canvas.canvasy(event.y)
 
         # ---------- COMMON: check resize handles first ----------
         handle_id, handle_dir = self._get_handle_at_pos(canvas, x, y)
@@ -128,7 +121,7 @@ class EditorTools:
 
     def on_mouse_move(self, event):
         canvas = event.widget
-        x, y = event.x, event.y
+        x, y = canvas.canvasx(event.x), canvas.canvasy(event.y)
 
         if self._mode == "select":
             # Drag selection box
@@ -138,8 +131,10 @@ class EditorTools:
 
             # Move selected region(s)
             elif self._dragging and self.selected_regions:
-                dx = x - self._drag_start_pos[0]
-                dy = y - self._drag_start_pos[1]
+                # Pointer moves are in canvas pixels, layer coords in image pixels
+                scale = getattr(self.app, "display_scale", 1.0) or 1.0
+                dx = (x - self._drag_start_pos[0]) / scale
+                dy = (y - self._drag_start_pos[1]) / scale
 
                 for i in self.selected_regions:
                     if i in self._orig_coords:
@@ -157,8 +152,9 @@ class EditorTools:
             canvas.coords(self._temp_rect, x0, y0, x, y)
 
         elif self._dragging and self.selected_region is not None:
-            dx = x - self._drag_start_pos[0]
-            dy = y - self._drag_start_pos[1]
+            scale = getattr(self.app, "display_scale", 1.0) or 1.0
+            dx = (x - self._drag_start_pos[0]) / scale
+            dy = (y - self._drag_start_pos[1]) / scale
             # Update region position
             layer = self.layer_manager.layers[self.selected_region]
             x1, y1, x2, y2 = self._orig_coords
@@ -167,8 +163,9 @@ class EditorTools:
             self.notify_layer_change()
 
         elif self._resizing and self.selected_region is not None:
-            dx = x - self._drag_start_pos[0]
-            dy = y - self._drag_start_pos[1]
+            scale = getattr(self.app, "display_scale", 1.0) or 1.0
+            dx = (x - self._drag_start_pos[0]) / scale
+            dy = (y - self._drag_start_pos[1]) / scale
             layer = self.layer_manager.layers[self.selected_region]
             x1, y1, x2, y2 = self._orig_coords
             dir = self._resize_handle
@@ -198,7 +195,7 @@ class EditorTools:
                 self._creating = False
 
                 x0, y0 = self._creation_start
-                x1, y1 = event.x, event.y
+                x1, y1 = canvas.canvasx(event.x), canvas.canvasy(event.y)
                 x0, x1 = sorted([x0, x1])
                 y0, y1 = sorted([y0, y1])
 
@@ -206,16 +203,9 @@ class EditorTools:
                 if abs(x1 - x0) < 5 or abs(y1 - y0) < 5:
                     return
 
-                # Multi-select: find regions whose canvas-space boxes intersect
-                hits = []
+                # Multi-select: find regions intersecting the box, topmost first
                 scale = getattr(self.app, "display_scale", 1.0) or 1.0
-                for i, layer in enumerate(self.layer_manager.layers):
-                    lx1, ly1, lx2, ly2 = layer.coords
-                    cx1, cy1 = lx1 * scale, ly1 * scale
-                    cx2, cy2 = lx2 * scale, ly2 * scale
-                    # simple AABB intersection test
-                    if not (cx2 < x0 or cx1 > x1 or cy2 < y0 or cy1 > y1):
-                        hits.append(i)
+                hits = self.layer_manager.layers_in((x0 / scale, y0 / scale, x1 / scale, y1 / scale))
 
                 if hits:
                     self.selected_regions = hits
@@ -243,7 +233,7 @@ class EditorTools:
             self._temp_rect = None
 
             x0, y0 = self._creation_start
-            x1, y1 = event.x, event.y
+            x1, y1 = canvas.canvasx(event.x), canvas.canvasy(event.y)
             x0, x1 = sorted([x0, x1])
             y0, y1 = sorted([y0, y1])
 
@@ -313,19 +303,16 @@ class EditorTools:
         return None, None
 
     def _get_region_at_pos(self, canvas_x, canvas_y):
-        """Return first region containing the canvas position (canvas_x, canvas_y)."""
+        """Return the topmost region containing the canvas position (canvas_x, canvas_y)."""
         scale = getattr(self.app, "display_scale", 1.0) or 1.0
         
         # Convert canvas coordinates to image coordinates
         image_x = canvas_x / scale
         image_y = canvas_y / scale
         
-        # Check which region contains this image position
-        for i, layer in enumerate(self.layer_manager.layers):
-            x1, y1, x2, y2 = layer.coords
-            if x1 <= image_x <= x2 and y1 <= image_y <= y2:
-                return i
-        return None
+        # Ask the layer manager's spatial index which regions contain this position
+        hits = self.layer_manager.layers_at(image_x, image_y)
+        return hits[0] if hits else None
 
 
     def _draw_resize_handles(self, canvas, region):
@@ -509,7 +496,11 @@ class EditorTools:
                 self.app._refresh_region_list()
 
     def notify_layer_change(self):
-        """Call this after any layer modification to update live preview."""
+        """Call this after any layer modification to update live preview.
+
+        The app coalesces these, so calling it on every motion event still
+        renders at most once per frame.
+        """
         if hasattr(self.app, "_on_layer_change"):
             self.app._on_layer_change()
         self.draw_selection_outline()
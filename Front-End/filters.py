@@ -0,0 +1,132 @@
+import os
+from PIL import Image, ImageFilter
+
+# NumPy and OpenCV are optional here, without them only the PIL backend exists
+try:
+    import numpy as np
+    import cv2
+except ImportError:
+    np = None
+    cv2 = None
+
+# Every kernel takes (image, box, intensity) and returns what Layer.render should
+# paste into box: an image of the box size, a fill colour, or None to leave the
+# pixels alone. Kernels read from the image but never modify it.
+
+# ---------- PIL (reference) ----------
+def _pil_blur(img, box, intensity):
+    return img.crop(box).filter(ImageFilter.GaussianBlur(intensity))
+
+def _pil_pixelate(img, box, intensity):
+    region = img.crop(box)
+    small = region.resize((max(1, region.width // max(1, intensity // 2)),
+                           max(1, region.height // max(1, intensity // 2))),
+                           Image.NEAREST)
+    return small.resize(region.size, Image.NEAREST)
+
+def _pil_redact(img, box, intensity):
+    return Image.new("RGBA", (box[2] - box[0], box[3] - box[1]), (0, 0, 0, 255))
+
+def _none(img, box, intensity):
+    return None
+
+# ---------- NumPy / OpenCV ----------
+def _np_blur(img, box, intensity):
+    if intensity <= 0:
+        return None
+    pixels = np.asarray(img.crop(box))
+    # Stack blur costs the same for any radius, a tent of radius r has sigma ~ r / 2.45.
+    # Kernels larger than the region crash some OpenCV builds, small regions are cheap anyway
+    ksize = 2 * int(round(intensity * 2.45)) + 1
+    if intensity > 8 and hasattr(cv2, "stackBlur") and ksize <= min(pixels.shape[:2]):
+        blurred = cv2.stackBlur(pixels, (ksize, ksize))
+    else:
+        blurred = cv2.GaussianBlur(pixels, (0, 0), sigmaX=intensity, borderType=cv2.BORDER_REPLICATE)
+    return Image.fromarray(blurred)
+
+def _np_pixelate(img, box, intensity):
+    pixels = np.asarray(img.crop(box))
+    height, width = pixels.shape[:2]
+    block = max(1, intensity // 2)
+    if block == 1:
+        return None
+
+    # Blocks are laid out from the box corner, the last row and column are cut
+    # short by the box edge and average only the pixels they cover
+    rows, cols = -(-height // block), -(-width // block)
+    full_rows, full_cols = height // block, width // block
+    means = np.empty((rows, cols, pixels.shape[2]), np.uint8)
+    if full_rows and full_cols:
+        # INTER_AREA averages whole blocks exactly, far faster than summing in NumPy
+        means[:full_rows, :full_cols] = cv2.resize(pixels[:full_rows * block, :full_cols * block],
+                                                   (full_cols, full_rows), interpolation=cv2.INTER_AREA)
+    if full_rows < rows:
+        means[-1] = _strip_means(pixels[full_rows * block:], block)
+    if full_cols < cols:
+        means[:, -1] = _strip_means(pixels[:, full_cols * block:].transpose(1, 0, 2), block)
+
+    out = cv2.resize(means, (cols * block, rows * block), interpolation=cv2.INTER_NEAREST)
+    return Image.fromarray(np.ascontiguousarray(out[:height, :width]))
+
+def _strip_means(strip, block):
+    """Means of consecutive `block` wide blocks along a strip less than a block high."""
+    columns = strip.mean(axis=0)
+    starts = np.arange(0, len(columns), block)
+    counts = np.diff(np.append(starts, len(columns)))
+    return np.rint(np.add.reduceat(columns, starts, axis=0) / counts[:, None]).astype(np.uint8)
+
+def _np_redact(img, box, intensity):
+    # A colour makes paste fill the box directly, no region buffer at all
+    return (0, 0, 0, 255)
+
+# How far past a pixel each method reads, so callers can draw part of a
+# layer; None when every pixel depends on the whole box
+REACH = {
+    # Both backends read within 3 sigma, but a part must also stay as wide as
+    # the stack blur kernel (2 * 2.45 sigma) or _np_blur falls back to GaussianBlur.
+    # cv2.stackBlur rounding still varies with the width, by one level at most
+    "blur": lambda intensity: 5 * int(intensity) + 2,
+    # Blocks are laid out over the whole box, so a part would not line up
+    "pixelate": lambda intensity: None,
+    "redact": lambda intensity: 0,
+    "none": lambda intensity: 0,
+}
+
+BACKENDS = {
+    "pil": {
+        "blur": _pil_blur,
+        "pixelate": _pil_pixelate,
+        "redact": _pil_redact,
+        "none": _none,
+    },
+}
+if np is not None:
+    BACKENDS["numpy"] = {
+        "blur": _np_blur,
+        "pixelate": _np_pixelate,
+        "redact": _np_redact,
+        "none": _none,
+    }
+
+_backend = None
+
+def set_backend(name):
+    """Select the filter backend ('pil' or 'numpy') used by every layer."""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown or unavailable filter backend: {name}")
+    _backend = name
+
+def get_backend():
+    return _backend
+
+def get_kernel(method):
+    """Kernel for a layer method in the current backend. Unknown methods leave pixels alone."""
+    return BACKENDS[_backend].get(method, _none)
+
+def reach(method, intensity):
+    """Pixels a layer's kernel reads around each pixel it writes, or None if it needs its whole box."""
+    return REACH.get(method, REACH["none"])(intensity)
+
+# Pick the fastest available backend unless BLANKIT_FILTERS says otherwise
+set_backend(os.environ.get("BLANKIT_FILTERS", "numpy" if "numpy" in BACKENDS else "pil"))
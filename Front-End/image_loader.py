@@ -0,0 +1,188 @@
+import math
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+# Memory allowed for cached pyramid levels, the full resolution master is not counted
+PYRAMID_MAX_BYTES = 256 * 1024 * 1024
+
+
+class ImageSource:
+    """An image file decoded only as far as each caller needs.
+
+    Opening reads just the header. preview() decodes a reduced copy for the
+    screen (JPEGs decode straight at 1/2, 1/4 or 1/8 size through draft mode;
+    other formats can only be decoded whole, so they are decoded once into the
+    master and scaled from it), and full() decodes the full resolution RGBA
+    master once, on first use, for detection and export. Nothing else keeps a
+    full-size copy around.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with Image.open(path) as img:
+            self.size = img.size
+            self.format = img.format
+        self._master = None
+        self._lock = threading.Lock()
+
+    @property
+    def width(self):
+        return self.size[0]
+
+    @property
+    def height(self):
+        return self.size[1]
+
+    @property
+    def is_loaded(self):
+        return self._master is not None
+
+    @property
+    def can_draft(self):
+        """Whether the file can be decoded straight at a reduced size."""
+        return self.format == "JPEG"
+
+    def fit_scale(self, max_dim):
+        """Scale that fits the image in max_dim x max_dim, never above 1."""
+        w, h = self.size
+        return min(max_dim / w, max_dim / h, 1.0)
+
+    def preview(self, max_dim):
+        """RGBA copy scaled to fit in max_dim x max_dim (never upscaled), and its scale."""
+        w, h = self.size
+        scale = self.fit_scale(max_dim)
+        target = (max(1, int(w * scale)), max(1, int(h * scale)))
+        return self.scaled(target), scale
+
+    def scaled(self, target):
+        """RGBA copy of the image resized to `target`, decoding as little as possible."""
+        if self._master is not None or not self.can_draft:
+            return self.full().resize(target, Image.Resampling.LANCZOS)
+
+        with Image.open(self.path) as img:
+            # Only does something for JPEG: picks the smallest DCT scale still >= target
+            img.draft("RGB", target)
+            if img.size != target:
+                img = img.resize(target, Image.Resampling.LANCZOS)
+            return img.convert("RGBA")
+
+    def full(self):
+        """The full resolution RGBA master buffer. Shared, do not modify."""
+        if self._master is None:
+            with self._lock:
+                if self._master is None:
+                    with Image.open(self.path) as img:
+                        img.load()
+                        self._master = img if img.mode == "RGBA" else img.convert("RGBA")
+        return self._master
+
+    def release(self):
+        """Drop the full resolution buffer, it is decoded again when needed."""
+        self._master = None
+
+
+class ImagePyramid:
+    """Power-of-two reductions of an ImageSource, built lazily for zooming.
+
+    Level k is the image at 1/2**k of full size. A level is made from the
+    nearest finer level already cached, or decoded straight from the file at
+    that size while the full image is not loaded (JPEG only, other formats
+    are decoded whole once and reduced from that), so a zoom step only ever
+    resamples from an image at most twice the size it needs. Levels are
+    evicted least recently used first once they use more than max_bytes.
+    """
+
+    def __init__(self, source, max_bytes=PYRAMID_MAX_BYTES):
+        self.source = source
+        self.max_bytes = max_bytes
+        self._levels = OrderedDict()  # level -> RGBA image, least recently used first
+        self._bytes = 0
+        self._loader = None  # thread decoding level 0 for region(wait=False)
+
+    def level_size(self, level):
+        w, h = self.source.size
+        return max(1, w >> level), max(1, h >> level)
+
+    def level(self, level):
+        """The image at 1/2**level size. Shared, do not modify."""
+        if level == 0:
+            return self.source.full()
+        if level in self._levels:
+            self._levels.move_to_end(level)
+            return self._levels[level]
+
+        size = self.level_size(level)
+        finer = [k for k in self._levels if k < level]
+        if finer:
+            image = self._levels[max(finer)].resize(size, Image.Resampling.BOX)
+        elif self.source.is_loaded or not self.source.can_draft:
+            image = self.source.full().resize(size, Image.Resampling.BOX)
+        else:
+            image = self.source.scaled(size)
+
+        self._levels[level] = image
+        self._bytes += _nbytes(image)
+        while self._bytes > self.max_bytes and len(self._levels) > 1:
+            _, evicted = self._levels.popitem(last=False)
+            self._bytes -= _nbytes(evicted)
+        return image
+
+    def ready(self, scale):
+        """Whether region(scale, ..., wait=False) gives the real pixels, not a coarser stand-in."""
+        return self._level_for(scale) > 0 or self.source.is_loaded
+
+    def _level_image(self, level, wait):
+        if level == 0 and not wait and not self.source.is_loaded and self._levels:
+            # Full resolution decodes on its own thread, the finest level cached stands in meanwhile
+            if self._loader is None or not self._loader.is_alive():
+                self._loader = threading.Thread(target=self.source.full, name="decode-full", daemon=True)
+                self._loader.start()
+            return self._levels[min(self._levels)]
+        return self.level(level)
+
+    def scaled_size(self, scale):
+        w, h = self.source.size
+        return max(1, int(w * scale)), max(1, int(h * scale))
+
+    def _level_for(self, scale):
+        """Coarsest level that is still at least as large as the picture at `scale`."""
+        if scale >= 1:
+            return 0
+        target = self.scaled_size(scale)
+        level = int(math.floor(math.log2(1 / scale)))
+        while level > 0 and any(l < t for l, t in zip(self.level_size(level), target)):
+            level -= 1
+        return level
+
+    def scaled(self, scale):
+        """RGBA image of the whole picture at `scale`, resampled from the nearest level above it."""
+        target = self.scaled_size(scale)
+        image = self.level(self._level_for(scale))
+        if image.size == target:
+            return image
+        return image.resize(target, Image.Resampling.LANCZOS)
+
+    def region(self, scale, box, wait=True):
+        """The pixel box (left, top, right, bottom) of scaled(scale), without resampling the rest.
+
+        With wait=False a full resolution region is upsampled from a cached
+        level while the full image decodes in the background, see ready().
+        """
+        target = self.scaled_size(scale)
+        image = self._level_image(self._level_for(scale), wait)
+        if image.size == target:
+            return image.crop(box)
+        # Resampling reads past the box edges where it needs to, so regions tile seamlessly
+        fx, fy = image.width / target[0], image.height / target[1]
+        left, top, right, bottom = box
+        return image.resize((right - left, bottom - top), Image.Resampling.LANCZOS,
+                            box=(left * fx, top * fy, right * fx, bottom * fy))
+
+    def clear(self):
+        self._levels.clear()
+        self._bytes = 0
+
+
+def _nbytes(image):
+    return image.width * image.height * len(image.getbands())
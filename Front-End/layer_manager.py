@@ -1,91 +1,188 @@
-from PIL import Image, ImageDraw, ImageFilter
+import itertools
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageDraw
+import filters
+from spatial_index import GridIndex
+
+# Memory allowed for cached shape masks, one byte per pixel
+MASK_CACHE_BYTES = 32 * 1024 * 1024
+
+_masks = OrderedDict()  # (shape, width, height) -> mask, least recently used first
+_mask_bytes = 0
+_mask_lock = threading.Lock()
+
+def shape_mask(shape, width, height):
+    """Region-sized 'L' mask for a shape, cached so dragging a layer reuses it. Do not modify."""
+    global _mask_bytes
+    key = (shape, width, height)
+    with _mask_lock:
+        mask = _masks.get(key)
+        if mask is not None:
+            _masks.move_to_end(key)
+            return mask
+
+    mask = Image.new('L', (width, height), 0)
+    draw = ImageDraw.Draw(mask)
+    draw.ellipse((0, 0, width, height), fill=255)
+
+    size = width * height
+    if size <= MASK_CACHE_BYTES // 4:  # a few huge masks would push out every small one
+        with _mask_lock:
+            if key not in _masks:
+                _masks[key] = mask
+                _mask_bytes += size
+            while _mask_bytes > MASK_CACHE_BYTES:
+                _, evicted = _masks.popitem(last=False)
+                _mask_bytes -= evicted.width * evicted.height
+    return mask
+
+_layer_ids = itertools.count(1)
 
 class Layer:
     def __init__(self, shape, coords, method='blur', intensity=10, size=0):
+        self._listener = None  # set by LayerManager to keep its spatial index current
+        self.id = next(_layer_ids)  # stable for the session, project files key rows by it
         self.shape = shape
         self.coords = coords  # (x1, y1, x2, y2)
         self.method = method
         self.intensity = intensity
         self.size = size
 
-    def apply(self, base_image):
-        img = base_image.copy().convert("RGBA")
-        x1, y1, x2, y2 = self.coords
+    @property
+    def coords(self):
+        return self._coords
+
+    @coords.setter
+    def coords(self, value):
+        self._coords = value
+        if self._listener is not None:
+            self._listener(self)
+
+    def state(self):
+        """Everything that affects how this layer renders, for change detection."""
+        return (self.shape, tuple(self.coords), self.method, self.intensity, self.size)
+
+    def bounds(self, width, height, scale=1.0):
+        """Pixel box (left, top, right, bottom) this layer touches in a width x height image drawn at scale."""
+        x1, y1, x2, y2 = (c * scale for c in self.coords)
         pad = self.size
 
         # Compute box and image coords and cast to int
         left   = int(max(0, x1 - pad))
         top    = int(max(0, y1 - pad))
-        right  = int(min(x2 + pad, img.width))
-        bottom = int(min(y2 + pad, img.height))
-
-        box = (left, top, right, bottom)        
-        region = img.crop(box)
-
-        if self.method == 'blur':
-            region = region.filter(ImageFilter.GaussianBlur(self.intensity))
-        elif self.method == 'pixelate':
-            small = region.resize((max(1, region.width // max(1, self.intensity // 2)),
-                                   max(1, region.height // max(1, self.intensity // 2))),
-                                    Image.NEAREST)
-            region = small.resize(region.size, Image.NEAREST)
-        elif self.method == 'redact':
-            region = Image.new("RGBA", region.size, (0, 0, 0, 255))
+        right  = int(min(x2 + pad, width))
+        bottom = int(min(y2 + pad, height))
+        return (left, top, right, bottom)
+
+    def render(self, img, box=None, clip=None, origin=(0, 0)):
+        """Apply this layer to an RGBA image in place. Returns the box it touched, or None.
+
+        To draw onto part of a larger (or scaled) image, pass the layer's `box`
+        there and the `origin` of img in the same coordinates. `clip` limits
+        drawing to part of the box; pixels at least filters.reach() inside the
+        clip edge come out as a full render would draw them.
+        """
+        if box is None:
+            box = self.bounds(img.width, img.height)
+        area = box if clip is None else (max(box[0], clip[0]), max(box[1], clip[1]),
+                                         min(box[2], clip[2]), min(box[3], clip[3]))
+        left, top, right, bottom = area
+        if right <= left or bottom <= top:
+            return None
+        ox, oy = origin
+        target = (left - ox, top - oy, right - ox, bottom - oy)
+
+        # Filter kernels come from the selected backend, see filters.py
+        result = filters.get_kernel(self.method)(img, target, self.intensity)
+        if result is None:
+            return target
 
         if self.shape in ['circle', 'oval']:
-            mask = Image.new('L', img.size, 0)
-            draw = ImageDraw.Draw(mask)
-            draw.ellipse(box, fill=255)
-            img.paste(region, box, mask.crop(box))
+            mask = shape_mask(self.shape, box[2] - box[0], box[3] - box[1])
+            if area != box:
+                mask = mask.crop((left - box[0], top - box[1], right - box[0], bottom - box[1]))
+            img.paste(result, target, mask)
         else:
-            img.paste(region, box)
+            img.paste(result, target)
+        return target
+
+    def apply(self, base_image):
+        # convert() already returns a new image, only copy when there is nothing to convert
+        img = base_image.copy() if base_image.mode == "RGBA" else base_image.convert("RGBA")
+        self.render(img)
         return img
 
 class LayerManager:
     def __init__(self):
         self.layers = []
+        self._index = GridIndex()
+        self._positions = {}  # id(layer) -> index in self.layers, rebuilt lazily
+        self._order = []      # self.layers as it was when _positions was built
 
     def add_layer(self, layer):
         self.layers.append(layer)
+        self._track(layer)
+        # Still in step afterwards if it was before, and still stale if it was not
+        self._order.append(layer)
+        self._positions[id(layer)] = len(self._order) - 1
         
     def remove_layer(self, index):
         if 0 <= index < len(self.layers):
+            self._untrack(self.layers[index])
             del self.layers[index]
 
     def clear_layers(self):
+        for layer in self.layers:
+            layer._listener = None
         self.layers = []
+        self._index.clear()
+        self._positions = {}
+        self._order = []
 
-    def merge_all(self, base_image):
-        img = base_image.convert("RGBA").copy()
-        for layer in self.layers:
-            img = layer.apply(img)
-        return img
-    
-    def create_preview(self, base_image, display_scale=1.0):
-        """
-        Create a scaled composite image applying all layers on scaled base image.
-        """
-        # Scale the base image to preview size
-        preview_size = (
-            int(base_image.width * display_scale),
-            int(base_image.height * display_scale)
-        )
-        base_preview = base_image.resize(preview_size, Image.Resampling.LANCZOS).copy().convert("RGBA")
+    def _track(self, layer):
+        layer._listener = self._on_layer_moved
+        self._index.insert(layer, layer.coords)
 
-        img = base_preview
+    def _untrack(self, layer):
+        layer._listener = None
+        self._index.remove(layer)
 
-        for layer in self.layers:
-            # Adjust layer coords to preview scale
-            scaled_coords = tuple(c * display_scale for c in layer.coords)
-            # Create a copy of layer with scaled coords to avoid modifying original
-            scaled_layer = Layer(
-                shape=layer.shape,
-                coords=scaled_coords,
-                method=layer.method,
-                intensity=layer.intensity,
-                size=layer.size
-            )
-            img = scaled_layer.apply(img)
+    def _on_layer_moved(self, layer):
+        self._index.update(layer, layer.coords)
 
-        return img
+    def _sync_index(self):
+        """Rebuild the layer positions after a removal or reorder (and the index, if self.layers was edited directly)."""
+        # Layers have no __eq__, so this compares them by identity
+        if self._order == self.layers:
+            return
+        if len(self._index) != len(self.layers) or any(layer not in self._index for layer in self.layers):
+            for layer in self._order:
+                layer._listener = None
+            self._index.clear()
+            for layer in self.layers:
+                self._track(layer)
+        self._order = list(self.layers)
+        self._positions = {id(layer): i for i, layer in enumerate(self.layers)}
+
+    def index_of(self, layer):
+        """Stack index of `layer`, or None when it is not in the stack."""
+        self._sync_index()
+        return self._positions.get(id(layer))
+
+    def layers_at(self, x, y):
+        """Indices of layers containing the image point (x, y), topmost first."""
+        self._sync_index()
+        return sorted((self._positions[id(layer)] for layer in self._index.query_point(x, y)), reverse=True)
+
+    def layers_in(self, box):
+        """Indices of layers intersecting the image-space box (x1, y1, x2, y2), topmost first."""
+        self._sync_index()
+        return sorted((self._positions[id(layer)] for layer in self._index.query_rect(box)), reverse=True)
 
+    def merge_all(self, base_image):
+        """Composite every layer onto a single working copy of base_image."""
+        img = base_image.copy() if base_image.mode == "RGBA" else base_image.convert("RGBA")
+        for layer in self.layers:
+            layer.render(img)
+        return img
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+from layer_manager import Layer
+
+# Projects are small SQLite files: a key/value meta table and one row per layer.
+# Layer rows are keyed by Layer.id, so an incremental save only rewrites the
+# layers that changed or moved in the stack and deletes the ones removed.
+# Version 1 keyed rows by position, it is still read and upgraded on the next save.
+FORMAT_VERSION = 2
+PROJECT_EXTENSION = ".blankit"
+
+_LAYERS_TABLE = """
+CREATE TABLE IF NOT EXISTS layers (
+    layer_id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    shape TEXT NOT NULL,
+    x1 REAL NOT NULL, y1 REAL NOT NULL, x2 REAL NOT NULL, y2 REAL NOT NULL,
+    method TEXT NOT NULL,
+    intensity INTEGER NOT NULL,
+    size INTEGER NOT NULL
+)
+"""
+_SCHEMA = "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);" + _LAYERS_TABLE
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """BLAKE2 hash of a file's bytes, read in chunks so the image is never decoded."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def default_autosave_dir():
+    return os.environ.get("BLANKIT_AUTOSAVE_DIR",
+                          os.path.join(os.path.expanduser("~"), ".cache", "blankit", "autosave"))
+
+def _connect(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(_SCHEMA)
+    return conn
+
+def _row(layer_id, position, state):
+    shape, (x1, y1, x2, y2), method, intensity, size = state
+    return (layer_id, position, shape, x1, y1, x2, y2, method, intensity, size)
+
+def _entries(layers):
+    return [(layer.id, layer.state()) for layer in layers]
+
+def _write(conn, image_path, image_hash, entries, previous=None):
+    """Write (layer id, state) entries in stack order, only touching rows that differ from `previous` when given."""
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("format_version", str(FORMAT_VERSION)),
+             ("image_path", image_path or ""),
+             ("image_hash", image_hash or "")],
+        )
+        if previous is None:
+            # Recreated rather than emptied, which also upgrades a version 1 table
+            conn.execute("DROP TABLE IF EXISTS layers")
+            conn.execute(_LAYERS_TABLE)
+            changed = [_row(layer_id, position, state) for position, (layer_id, state) in enumerate(entries)]
+        else:
+            before = {layer_id: (position, state) for position, (layer_id, state) in enumerate(previous)}
+            changed = [_row(layer_id, position, state) for position, (layer_id, state) in enumerate(entries)
+                       if before.get(layer_id) != (position, state)]
+            current = {layer_id for layer_id, _ in entries}
+            conn.executemany("DELETE FROM layers WHERE layer_id = ?",
+                             [(layer_id,) for layer_id in before if layer_id not in current])
+        conn.executemany("INSERT OR REPLACE INTO layers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", changed)
+
+def save_project(path, image_path, image_hash, layers):
+    """Write a complete project file."""
+    conn = _connect(path)
+    try:
+        _write(conn, image_path, image_hash, _entries(layers))
+    finally:
+        conn.close()
+
+
+class Project:
+    """A loaded project: where its image was, a hash of that image, and the layers."""
+
+    def __init__(self, path, image_path, image_hash, layers):
+        self.path = path
+        self.image_path = image_path
+        self.image_hash = image_hash
+        self.layers = layers
+
+    def image_matches(self, image_hash):
+        """True if `image_hash` (see file_hash) is the content the project was made on."""
+        return not self.image_hash or image_hash == self.image_hash
+
+
+def load_project(path):
+    """Read a project file: one pass over the meta table and the layer rows."""
+    conn = sqlite3.connect(path)
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        version = int(meta.get("format_version", 0))
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Project format {version} is newer than this version of BlankIt supports")
+
+        layers = [
+            Layer(shape=shape, coords=(x1, y1, x2, y2), method=method, intensity=intensity, size=size)
+            for shape, x1, y1, x2, y2, method, intensity, size in conn.execute(
+                "SELECT shape, x1, y1, x2, y2, method, intensity, size FROM layers ORDER BY position")
+        ]
+    finally:
+        conn.close()
+    return Project(path, meta.get("image_path") or None, meta.get("image_hash") or None, layers)
+
+
+class Autosaver:
+    """Saves the layer stack in the background, writing only the layers that changed.
+
+    Call snapshot() from the UI thread whenever convenient; it is O(layers) and
+    never touches the disk. A writer thread picks up the newest snapshot and
+    rewrites just the rows that differ from what it last wrote.
+    """
+
+    def __init__(self, path, image_path, image_hash):
+        self.path = path
+        self.image_path = image_path
+        self.image_hash = image_hash
+        self.error = None          # why the last write failed, None once one succeeds
+        self._last_entries = None  # last snapshot handed to the writer
+        self._pending = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def snapshot(self, layers):
+        """Queue the current layers for saving if they changed since the last snapshot."""
+        entries = _entries(layers)
+        if entries == self._last_entries:
+            return False
+        self._last_entries = entries
+        # Only the newest snapshot matters, replace one that is still waiting
+        try:
+            self._pending.get_nowait()
+        except queue.Empty:
+            pass
+        self._pending.put(entries)
+        return True
+
+    def close(self):
+        """Flush the last snapshot and stop the writer thread."""
+        self._pending.put(None)
+        self._thread.join()
+
+    def _run(self):
+        conn = None
+        written = None
+        try:
+            while True:
+                entries = self._pending.get()
+                if entries is None:
+                    break
+                try:
+                    if conn is None:
+                        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                        conn = _connect(self.path)
+                    _write(conn, self.image_path, self.image_hash, entries, written)
+                    written = entries
+                    self.error = None
+                except (sqlite3.Error, OSError) as e:
+                    # Keep taking snapshots, so close() never waits on a full queue
+                    print("Autosave failed:", e)
+                    self.error = str(e)
+                    written = None  # next save rewrites everything
+        finally:
+            if conn is not None:
+                conn.close()
@@ -0,0 +1,256 @@
+import tkinter as tk
+import customtkinter
+
+ROW_HEIGHT = 34
+SHAPE_OPTIONS = ['rectangle', 'circle', 'oval']
+METHOD_OPTIONS = ['blur', 'redact', 'pixelate', 'none']
+# Windows and macOS send <MouseWheel> with a delta, X11 sends buttons 4 (up) and 5 (down)
+WHEEL_EVENTS = ("<MouseWheel>", "<Button-4>", "<Button-5>")
+WHEEL_ROWS = 3
+
+
+class _RegionRow:
+    """One reusable row widget. It is pointed at different layers as the list scrolls."""
+
+    def __init__(self, parent, region_list):
+        self.region_list = region_list
+        self.index = None
+        self.placed = False
+        self._shown = None  # (index, summary, selected) currently on screen
+
+        self.frame = customtkinter.CTkFrame(parent, fg_color="transparent", height=ROW_HEIGHT)
+        self.header_btn = customtkinter.CTkButton(
+            self.frame,
+            text="",
+            fg_color="#545E56",
+            hover_color="#667761",
+            text_color="#1B1B1E",
+            command=lambda: self.index is not None and region_list.on_select(self.index),
+        )
+        self.header_btn.pack(side="left", fill="x", expand=True, padx=(0, 4))
+
+        # Toggle button to show/hide details
+        self.toggle_btn = customtkinter.CTkButton(
+            self.frame,
+            text="⋯",
+            width=32,
+            fg_color="#545E56",
+            hover_color="#667761",
+            command=lambda: self.index is not None and region_list.toggle_details(self.index),
+        )
+        self.toggle_btn.pack(side="right")
+
+        for widget in (self.frame, self.header_btn, self.toggle_btn):
+            for sequence in WHEEL_EVENTS:
+                widget.bind(sequence, region_list._on_mousewheel, add="+")
+
+    def show(self, index, layer, selected):
+        """Point the row at a layer, touching only the widgets whose content changed."""
+        self.index = index
+        summary = f"{index+1}: {layer.shape} - {layer.method}"
+        shown = (index, summary, selected)
+        if shown == self._shown:
+            return
+        if self._shown is None or self._shown[1] != summary:
+            self.header_btn.configure(text=summary)
+        if self._shown is None or self._shown[2] != selected:
+            # highlighted background for selected rows
+            self.header_btn.configure(fg_color="#EBD494" if selected else "#545E56")
+        self._shown = shown
+
+    def hide(self):
+        self.index = None
+
+
+class RegionList(customtkinter.CTkFrame):
+    """Virtualized list of regions.
+
+    Only the rows that fit on screen exist as widgets; scrolling re-points them
+    at other layers. Details for one layer at a time are shown in a panel
+    below the list. refresh() updates the existing widgets in place, so it is
+    cheap to call on every selection or layer change.
+    """
+
+    def __init__(self, parent, app, height=240, bg_color=None, details_color=None, text_color=None):
+        super().__init__(parent, fg_color=bg_color)
+        self.app = app
+        self.layer_manager = app.layer_manager
+        self._first = 0
+        self._rows = []
+        self._expanded = None  # layer whose details are shown, followed when the stack changes
+        self._details_shown = None
+        self._text_color = text_color
+
+        body = customtkinter.CTkFrame(self, fg_color="transparent", height=height)
+        body.pack(fill="x")
+        body.pack_propagate(False)
+
+        self.scrollbar = tk.Scrollbar(body, orient="vertical", command=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.rows_frame = customtkinter.CTkFrame(body, fg_color="transparent")
+        self.rows_frame.pack(side="left", fill="both", expand=True)
+        self.rows_frame.bind("<Configure>", self._on_resize)
+        for sequence in WHEEL_EVENTS:
+            self.rows_frame.bind(sequence, self._on_mousewheel)
+
+        self._build_details(details_color)
+
+    # ---------- data / callbacks ----------
+    def _selected(self):
+        return getattr(self.app.editor_tools, "selected_regions", [])
+
+    def on_select(self, index):
+        self.app.editor_tools.select_region(index)
+
+    def toggle_details(self, index):
+        layer = self.layer_manager.layers[index]
+        self._expanded = None if self._expanded is layer else layer
+        self.refresh()
+
+    def _expanded_index(self):
+        """Stack index of the layer whose details are shown, or None."""
+        if self._expanded is None:
+            return None
+        return self.layer_manager.index_of(self._expanded)
+
+    # ---------- layout ----------
+    def _visible_count(self):
+        return max(1, self.rows_frame.winfo_height() // ROW_HEIGHT)
+
+    def _on_resize(self, event=None):
+        wanted = self._visible_count()
+        # Grow or shrink the row pool to what fits, rows are reused otherwise
+        while len(self._rows) < wanted:
+            self._rows.append(_RegionRow(self.rows_frame, self))
+        while len(self._rows) > wanted:
+            self._rows.pop().frame.destroy()
+        self.refresh()
+
+    def _on_scroll(self, action, amount, unit=None):
+        total = len(self.layer_manager.layers)
+        if action == "moveto":
+            first = int(float(amount) * total)
+        else:
+            step = self._visible_count() if unit == "pages" else 1
+            first = self._first + int(amount) * step
+        self.scroll_to(first)
+
+    def _on_mousewheel(self, event):
+        # Only the direction counts, macOS deltas are far smaller than one Windows notch
+        up = event.num == 4 or (event.num != 5 and event.delta > 0)
+        self.scroll_to(self._first + (-WHEEL_ROWS if up else WHEEL_ROWS))
+        return "break"
+
+    def scroll_to(self, first):
+        total = len(self.layer_manager.layers)
+        first = max(0, min(first, total - len(self._rows)))
+        if first != self._first:
+            self._first = first
+            self.refresh()
+
+    def see(self, index):
+        """Scroll just enough to make the row for `index` visible."""
+        if index < self._first:
+            self.scroll_to(index)
+        elif index >= self._first + len(self._rows):
+            self.scroll_to(index - len(self._rows) + 1)
+
+    def refresh(self):
+        """Bring the visible rows and the details panel up to date with the layers."""
+        layers = self.layer_manager.layers
+        total = len(layers)
+        self._first = max(0, min(self._first, total - len(self._rows)))
+        selected = set(self._selected())
+
+        for offset, row in enumerate(self._rows):
+            index = self._first + offset
+            if index < total:
+                row.show(index, layers[index], index in selected)
+                if not row.placed:
+                    row.frame.place(x=0, y=offset * ROW_HEIGHT, relwidth=1.0)
+                    row.placed = True
+            elif row.placed:
+                row.hide()
+                row.frame.place_forget()
+                row.placed = False
+
+        if total:
+            self.scrollbar.set(self._first / total, min(1.0, (self._first + len(self._rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+        if self._expanded_index() is None:
+            self._expanded = None
+        self._refresh_details()
+
+    # ---------- details panel ----------
+    def _build_details(self, details_color):
+        self.details = customtkinter.CTkFrame(self, fg_color=details_color)
+        self.details_title = customtkinter.CTkLabel(self.details, text="", text_color=self._text_color)
+        self.details_title.pack(anchor="w", padx=8, pady=(4, 0))
+        self.coord_label = customtkinter.CTkLabel(self.details, text="", text_color=self._text_color)
+        self.coord_label.pack(anchor="w", padx=8, pady=(4, 0))
+        self.inten_label = customtkinter.CTkLabel(self.details, text="", text_color=self._text_color)
+
+        # Buttons row
+        self.btn_row = customtkinter.CTkFrame(self.details, fg_color="transparent")
+        self.btn_row.pack(fill="x", padx=4, pady=4)
+        customtkinter.CTkButton(
+            self.btn_row, text="Copy", width=60, fg_color="#545E56", hover_color="#667761",
+            command=lambda: self._expanded is not None and self.app.editor_tools.copy_region(self._expanded_index())
+        ).pack(side="left", padx=4)
+        customtkinter.CTkButton(
+            self.btn_row, text="Delete", width=70, fg_color="#545E56", hover_color="#667761",
+            command=self._delete_expanded
+        ).pack(side="left", padx=4)
+
+        self.shape_combo = customtkinter.CTkComboBox(
+            self.details, values=SHAPE_OPTIONS, width=100, state="readonly",
+            command=lambda val: self._expanded is not None and self.app._on_shape_change(self._expanded_index(), val)
+        )
+        self.shape_combo.pack(anchor="w", padx=8, pady=(4, 0))
+        self.method_combo = customtkinter.CTkComboBox(
+            self.details, values=METHOD_OPTIONS, width=100, state="readonly",
+            command=lambda val: self._expanded is not None and self.app._on_method_change(self._expanded_index(), val)
+        )
+        self.method_combo.pack(anchor="w", padx=8, pady=(4, 8))
+
+    def _delete_expanded(self):
+        if self._expanded is not None:
+            index, self._expanded = self._expanded_index(), None
+            self.app.editor_tools.delete_region(index)
+
+    def _refresh_details(self):
+        index = self._expanded_index()
+        if index is None:
+            if self._details_shown is not None:
+                self.details.pack_forget()
+                self._details_shown = None
+            return
+
+        layer = self._expanded
+        scale = getattr(self.app, "display_scale", 1.0) or 1.0
+
+        # Coordinates (canvas units)
+        x1, y1, x2, y2 = layer.coords
+        cx1, cy1 = int(x1 * scale), int(y1 * scale)
+        cx2, cy2 = int(x2 * scale), int(y2 * scale)
+        shown = (index, layer.state(), scale)
+        if shown == self._details_shown:
+            return
+
+        self.details_title.configure(text=f"Region {index + 1}")
+        self.coord_label.configure(text=f"Coords: ({cx1}, {cy1}) → ({cx2}, {cy2})")
+
+        # Intensity only for blur/pixelate
+        if layer.method in ("blur", "pixelate"):
+            self.inten_label.configure(text=f"Intensity: {layer.intensity}")
+            self.inten_label.pack(anchor="w", padx=8, pady=(2, 0), after=self.coord_label)
+        else:
+            self.inten_label.pack_forget()
+
+        self.shape_combo.set(layer.shape)
+        self.method_combo.set(layer.method)
+        if self._details_shown is None:
+            self.details.pack(fill="x", padx=4, pady=(4, 4))
+        self._details_shown = shown
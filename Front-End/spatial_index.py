@@ -0,0 +1,92 @@
+from collections import defaultdict
+
+class GridIndex:
+    """Uniform grid over (x1, y1, x2, y2) boxes for fast point and rectangle queries.
+
+    Each key is stored in every cell its box overlaps, so a query only looks
+    at the keys sharing its cells instead of every key.
+    """
+
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self._cells = defaultdict(set)
+        self._boxes = {}
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __contains__(self, key):
+        return key in self._boxes
+
+    def _cell_range(self, box):
+        x1, y1, x2, y2 = box
+        size = self.cell_size
+        return (int(x1 // size), int(y1 // size), int(x2 // size), int(y2 // size))
+
+    def insert(self, key, box):
+        x1, y1, x2, y2 = box
+        box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        if key in self._boxes:
+            if self._boxes[key] == box:
+                return
+            self.remove(key)
+        self._boxes[key] = box
+        cx1, cy1, cx2, cy2 = self._cell_range(box)
+        for cy in range(cy1, cy2 + 1):
+            for cx in range(cx1, cx2 + 1):
+                self._cells[(cx, cy)].add(key)
+
+    # Moving or resizing is a remove and re-insert
+    update = insert
+
+    def remove(self, key):
+        box = self._boxes.pop(key, None)
+        if box is None:
+            return
+        cx1, cy1, cx2, cy2 = self._cell_range(box)
+        for cy in range(cy1, cy2 + 1):
+            for cx in range(cx1, cx2 + 1):
+                cell = self._cells.get((cx, cy))
+                if cell is not None:
+                    cell.discard(key)
+                    if not cell:
+                        del self._cells[(cx, cy)]
+
+    def clear(self):
+        self._cells.clear()
+        self._boxes.clear()
+
+    def query_point(self, x, y):
+        """Keys whose box contains (x, y), edges included."""
+        size = self.cell_size
+        cell = self._cells.get((int(x // size), int(y // size)), ())
+        hits = []
+        for key in cell:
+            x1, y1, x2, y2 = self._boxes[key]
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                hits.append(key)
+        return hits
+
+    def query_rect(self, box):
+        """Keys whose box intersects `box`, touching edges included."""
+        x1, y1, x2, y2 = box
+        box = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        cx1, cy1, cx2, cy2 = self._cell_range(box)
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self._boxes):
+            # Query covers more cells than there are keys, checking them all is cheaper
+            candidates = self._boxes
+        else:
+            candidates = set()
+            for cy in range(cy1, cy2 + 1):
+                for cx in range(cx1, cx2 + 1):
+                    cell = self._cells.get((cx, cy))
+                    if cell:
+                        candidates |= cell
+
+        qx1, qy1, qx2, qy2 = box
+        hits = []
+        for key in candidates:
+            x1, y1, x2, y2 = self._boxes[key]
+            if not (x2 < qx1 or x1 > qx2 or y2 < qy1 or y1 > qy2):
+                hits.append(key)
+        return hits
@@ -0,0 +1,170 @@
+from collections import OrderedDict
+from PIL import Image
+import filters
+
+TILE_SIZE = 256
+MAX_TILES = 192  # about 48 MB of cached RGBA tiles
+MARGIN = TILE_SIZE // 2  # rendered around the viewport so small scrolls hit the cache
+
+
+def intersects(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def changed_boxes(old_entries, new_entries, size):
+    """Boxes touched by layers that differ between two rendered stacks.
+
+    Entries start with (layer, state, box); a reordered stack changes how
+    overlapping layers combine, so it dirties the whole width x height area.
+    """
+    width, height = size
+    old = {(id(entry[0]), entry[1]): entry[2] for entry in old_entries}
+    new = {(id(entry[0]), entry[1]): entry[2] for entry in new_entries}
+
+    old_order = [id(entry[0]) for entry in old_entries]
+    new_order = [id(entry[0]) for entry in new_entries]
+    common = set(old_order) & set(new_order)
+    if [i for i in old_order if i in common] != [i for i in new_order if i in common]:
+        return [(0, 0, width, height)]
+
+    dirty = [box for key, box in old.items() if key not in new]
+    dirty += [box for key, box in new.items() if key not in old]
+    return dirty
+
+def spread_dirty(entries, dirty):
+    """Indices of entries that must be redrawn for the dirty boxes, growing `dirty` in place.
+
+    Any layer overlapping a dirty area has to be redrawn, and the area it
+    covers then becomes dirty too, since its filter reads those pixels.
+    """
+    redraw = set()
+    grew = True
+    while grew:
+        grew = False
+        for i, entry in enumerate(entries):
+            if i not in redraw and any(intersects(entry[2], d) for d in dirty):
+                redraw.add(i)
+                dirty.append(entry[2])
+                grew = True
+    return redraw
+
+
+class TiledPreview:
+    """Live preview that only renders the part of the image on screen.
+
+    The composite is cut into TILE_SIZE tiles at the render scale, which is
+    the display scale up to 100% and full resolution beyond that (the window
+    is then magnified for display). Tiles are rendered when they first come
+    into view and kept until a layer change touches them, so scrolling only
+    renders the newly revealed strip and layers outside the viewport cost
+    nothing but their change check.
+
+    Full resolution tiles are drawn from a coarser level while the full image
+    decodes in the background, and redrawn once pyramid.ready() says it is in.
+    """
+
+    def __init__(self, layer_manager, pyramid):
+        self.layer_manager = layer_manager
+        self.pyramid = pyramid
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop every cached tile."""
+        self._scale = None
+        self._size = None
+        self._stand_in = False  # tiles were drawn before the level for this scale was ready
+        self._tiles = OrderedDict()  # (col, row) -> RGBA tile, least recently used first
+        self._entries = []           # (layer, state, box) as last seen
+
+    def render(self, display_scale, viewport):
+        """Composite covering `viewport` (x1, y1, x2, y2, canvas pixels) at display_scale.
+
+        Returns (image, (x, y)) where (x, y) is the image's top-left on the
+        canvas. The image is rebuilt on every call and belongs to the caller.
+        """
+        scale = min(display_scale, 1.0)
+        zoom = display_scale / scale
+        ready = self.pyramid.ready(scale)
+        if scale != self._scale or (self._stand_in and ready):
+            self.invalidate()
+            self._scale = scale
+            self._size = self.pyramid.scaled_size(scale)
+        self._stand_in = not ready
+        width, height = self._size
+
+        entries = [(layer, layer.state(), layer.bounds(width, height, scale))
+                   for layer in self.layer_manager.layers]
+        dirty = changed_boxes(self._entries, entries, self._size)
+        self._entries = entries
+        if dirty:
+            spread_dirty(entries, dirty)
+            for key in [key for key in self._tiles if any(intersects(self._tile_box(key), d) for d in dirty)]:
+                del self._tiles[key]
+
+        # Tiles under the viewport plus a margin, in render-scale pixels
+        x1, y1, x2, y2 = viewport
+        left = max(0, int(x1 / zoom) - MARGIN) // TILE_SIZE
+        top = max(0, int(y1 / zoom) - MARGIN) // TILE_SIZE
+        right = (min(width, int(x2 / zoom) + MARGIN) - 1) // TILE_SIZE
+        bottom = (min(height, int(y2 / zoom) + MARGIN) - 1) // TILE_SIZE
+        visible = [(col, row) for row in range(top, bottom + 1) for col in range(left, right + 1)]
+
+        missing = [key for key in visible if key not in self._tiles]
+        if missing:
+            self._render_tiles(missing, entries)
+
+        origin = (left * TILE_SIZE, top * TILE_SIZE)
+        window_box = self._tile_box((left, top))[:2] + self._tile_box((right, bottom))[2:]
+        window = Image.new("RGBA", (window_box[2] - window_box[0], window_box[3] - window_box[1]))
+        for key in visible:
+            self._tiles.move_to_end(key)
+            box = self._tile_box(key)
+            window.paste(self._tiles[key], (box[0] - origin[0], box[1] - origin[1]))
+        while len(self._tiles) > max(MAX_TILES, len(visible)):
+            self._tiles.popitem(last=False)
+
+        if zoom != 1:
+            window = window.resize((max(1, round(window.width * zoom)), max(1, round(window.height * zoom))),
+                                   Image.Resampling.NEAREST)
+        return window, (origin[0] * zoom, origin[1] * zoom)
+
+    def _tile_box(self, key):
+        col, row = key
+        width, height = self._size
+        return (col * TILE_SIZE, row * TILE_SIZE,
+                min(width, (col + 1) * TILE_SIZE), min(height, (row + 1) * TILE_SIZE))
+
+    def _render_tiles(self, keys, entries):
+        """Render the given tiles in one pass over the box that holds them."""
+        boxes = [self._tile_box(key) for key in keys]
+        region = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                  max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+        # Walking down from the top, each layer is drawn over the area that must
+        # come out right plus what its filter reads around it, and the layers
+        # below must then get that area right too. Query again until it settles
+        pad = max((layer.size for layer in self.layer_manager.layers), default=0)
+        scale = self._scale
+        need, queried = region, None
+        while need != queried:
+            queried = x1, y1, x2, y2 = need
+            need, clips = region, []
+            for i in self.layer_manager.layers_in(((x1 - pad) / scale, (y1 - pad) / scale,
+                                                   (x2 + pad) / scale, (y2 + pad) / scale)):
+                layer, _, box = entries[i]
+                reach = filters.reach(layer.method, layer.intensity)
+                clip = box if reach is None else (max(box[0], need[0] - reach), max(box[1], need[1] - reach),
+                                                  min(box[2], need[2] + reach), min(box[3], need[3] + reach))
+                if not intersects(box, need) or clip[2] <= clip[0] or clip[3] <= clip[1]:
+                    continue
+                clips.append((i, clip))
+                need = (min(need[0], clip[0]), min(need[1], clip[1]),
+                        max(need[2], clip[2]), max(need[3], clip[3]))
+
+        image = self.pyramid.region(scale, need, wait=False)
+        ox, oy = need[:2]
+        for i, clip in reversed(clips):
+            layer, _, box = entries[i]
+            layer.render(image, box, clip, (ox, oy))
+
+        for key, box in zip(keys, boxes):
+            self._tiles[key] = image.crop((box[0] - ox, box[1] - oy, box[2] - ox, box[3] - oy))
@@ -1,12 +1,45 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk
+from PIL import ImageTk
 import customtkinter
 from layer_manager import LayerManager, Layer
 from editor_tools import EditorTools
+from region_list import RegionList
+from image_loader import ImageSource, ImagePyramid
+from tiled_preview import TiledPreview
+import project
 import functools
 import os
-
+import queue
+import sys
+import threading
+import time
+
+# The detection backend lives in src/, span tracing is shared with it
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from tracing import span
+
+# Resolution settings for "AI Redact": detect on a reduced copy split into
+# parallel tiles, and re-check face candidates at full resolution.
+# See DETECTION_OPTIONS in src/main.py.
+AI_DETECTION_OPTIONS = {
+    'face': {'max_size': 2048, 'refine': True, 'tile_size': 1024},
+    'plate': {'max_size': 2048, 'refine': False, 'tile_size': 1024},
+}
+
+# Minimum time between two live preview renders, about one 60 Hz display frame
+FRAME_MS = 16
+# While full resolution decodes in the background, how often to check whether it is in
+FULL_RES_POLL_MS = 100
+# Preview size at load, and zoom limits relative to it and to full resolution
+PREVIEW_MAX_DIM = 800
+ZOOM_OUT_LIMIT = 4
+ZOOM_MAX = 8.0
+# How often the layer stack is checked for changes and autosaved
+AUTOSAVE_MS = 2000
+# Detection models start loading in the background this long after startup,
+# once the window is on screen
+WARM_UP_DELAY_MS = 200
 
 
 class ImageRedactorApp(customtkinter.CTk):
@@ -25,15 +58,31 @@ class ImageRedactorApp(customtkinter.CTk):
         self._move_handle_id = None
         self._moving_group = False
         self.image = None
-        self.original_image = None
-        self.display_image = None
+        self.image_source = None  # lazily decoded file, see original_image
+        self.image_pyramid = None
+        self.tiled_preview = None
         self.display_scale = 1.0
+        self.fit_scale = 1.0
         self.canvas_image_id = None
         self.live_composite_image = None
         self.live_tk_image = None
+        self._render_job = None
+        self._full_res_job = None
+        self._last_render = 0.0
+        self._ai_cancel = None
+        self._ai_events = None
+        self.image_path = None
+        self.image_hash = None
+        self.project_path = None
+        self.autosaver = None
+        self._autosave_error = None  # last autosave error shown in the status bar
         self.create_toolbar()
         self.create_main_widgets()
         self.apply_initial_appearance()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        # The first AI Redact would otherwise wait for OpenCV, dlib and the models
+        self.after(WARM_UP_DELAY_MS, self._start_backend_warm_up)
+        self.after(AUTOSAVE_MS, self._autosave_tick)
 
     def create_toolbar(self):
         toolbar = customtkinter.CTkFrame(self, fg_color="#545E56")
@@ -45,8 +94,12 @@ class ImageRedactorApp(customtkinter.CTk):
         btn_open.pack(side="left", padx=5, pady=5)
         btn_save = customtkinter.CTkButton(toolbar, text="Save", fg_color=btn_fg, hover_color=btn_hover, text_color=btn_text, command=self.save_image)
         btn_save.pack(side="left", padx=5, pady=5)
+        btn_open_project = customtkinter.CTkButton(toolbar, text="Open Project", fg_color=btn_fg, hover_color=btn_hover, text_color=btn_text, command=self.open_project)
+        btn_open_project.pack(side="left", padx=5, pady=5)
+        btn_save_project = customtkinter.CTkButton(toolbar, text="Save Project", fg_color=btn_fg, hover_color=btn_hover, text_color=btn_text, command=self.save_project)
+        btn_save_project.pack(side="left", padx=5, pady=5)
         
-        btn_ai = customtkinter.CTkButton(
+        self.btn_ai = customtkinter.CTkButton(
             toolbar, 
             text="AI Redact", 
             fg_color="#4A7C59", 
@@ -54,16 +107,32 @@ class ImageRedactorApp(customtkinter.CTk):
             text_color=btn_text, 
             command=self.run_ai_redaction
         )
-        btn_ai.pack(side="left", padx=5, pady=5)
+        self.btn_ai.pack(side="left", padx=5, pady=5)
 
-        btn_exit = customtkinter.CTkButton(toolbar, text="Exit", fg_color=btn_fg, hover_color=btn_hover, text_color=btn_text, command=self.quit)
+        btn_exit = customtkinter.CTkButton(toolbar, text="Exit", fg_color=btn_fg, hover_color=btn_hover, text_color=btn_text, command=self._on_close)
         btn_exit.pack(side="left", padx=5, pady=5)
 
+        # AI progress widgets, only shown while detection runs
+        self.ai_progress_frame = customtkinter.CTkFrame(toolbar, fg_color="transparent")
+        self.ai_progress_label = customtkinter.CTkLabel(self.ai_progress_frame, text="", text_color=btn_text)
+        self.ai_progress_label.pack(side="left", padx=5)
+        self.ai_progress_bar = customtkinter.CTkProgressBar(self.ai_progress_frame, width=160)
+        self.ai_progress_bar.pack(side="left", padx=5)
+        self.ai_cancel_button = customtkinter.CTkButton(
+            self.ai_progress_frame, text="Cancel", width=70, fg_color=btn_fg,
+            hover_color=btn_hover, text_color=btn_text, command=self.cancel_ai_redaction
+        )
+        self.ai_cancel_button.pack(side="left", padx=5)
+
 
         self.dark_mode_switch = customtkinter.CTkSwitch(toolbar, text="Dark Mode", command=self.toggle_dark_mode)
         self.dark_mode_switch.pack(side="right", padx=5, pady=5)
 
     def create_main_widgets(self):
+        # Packed first so the content area never pushes it off the window
+        self.status_label = customtkinter.CTkLabel(self, text="", anchor="w")
+        self.status_label.pack(side="bottom", fill="x", padx=8)
+
         self.content_frame = customtkinter.CTkFrame(self)
         self.content_frame.pack(fill="both", expand=True, padx=8, pady=8)
         
@@ -74,7 +143,7 @@ class ImageRedactorApp(customtkinter.CTk):
         self.v_scroll = tk.Scrollbar(self.canvas_container, orient="vertical")
         self.h_scroll = tk.Scrollbar(self.canvas_container, orient="horizontal")
         self.canvas = tk.Canvas(self.canvas_container, bg="#EAE1DF", bd=0, highlightthickness=0,
-                                yscrollcommand=self.v_scroll.set, xscrollcommand=self.h_scroll.set)
+                                yscrollcommand=self._on_canvas_yview, xscrollcommand=self._on_canvas_xview)
         self.v_scroll.config(command=self.canvas.yview)
         self.h_scroll.config(command=self.canvas.xview)
         
@@ -106,6 +175,12 @@ class ImageRedactorApp(customtkinter.CTk):
         self.editor_placeholder.pack(padx=12, pady=12)
         
         # Bind canvas events for editing
+        self.canvas.bind("<Enter>", lambda e: self.canvas.focus_set())
+        self.canvas.bind("<Configure>", lambda e: self.schedule_preview())
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        # X11 sends the wheel as buttons 4 and 5 instead of <MouseWheel>
+        self.canvas.bind("<Control-Button-4>", self._on_mousewheel)
+        self.canvas.bind("<Control-Button-5>", self._on_mousewheel)
         self.canvas.bind("<Button-1>", self.editor_tools.on_mouse_down)
         self.canvas.bind("<B1-Motion>", self.editor_tools.on_mouse_move)
         self.canvas.bind("<ButtonRelease-1>", self.editor_tools.on_mouse_up)
@@ -114,34 +189,142 @@ class ImageRedactorApp(customtkinter.CTk):
         file_path = filedialog.askopenfilename(filetypes=[("Image files", "*.png;*.jpg;*.jpeg;*.bmp")])
         if not file_path:
             return
-        pil = Image.open(file_path).convert('RGBA')
-        self.original_image = pil.copy()
-        
-        max_dim = 800
-        w, h = pil.size
-        self.display_scale = min(max_dim / w, max_dim / h, 1.0)
-        disp_w, disp_h = int(w * self.display_scale), int(h * self.display_scale)
-        self.display_image = pil.resize((disp_w, disp_h), Image.Resampling.LANCZOS)
-        self.tk_image = ImageTk.PhotoImage(self.display_image)
+        self.open_image_file(file_path)
+
+        # Offer to bring back edits from an earlier session on the same image
+        autosave_path = self._autosave_path_for(self.image_hash)
+        if os.path.exists(autosave_path):
+            try:
+                saved = project.load_project(autosave_path)
+            except Exception:
+                saved = None
+            if saved is not None and saved.layers and messagebox.askyesno(
+                "Restore", f"Restore {len(saved.layers)} region(s) from your last session on this image?"
+            ):
+                self._set_layers(saved.layers)
+        self._start_autosave(autosave_path)
+
+    def open_image_file(self, file_path, layers=None, image_hash=None):
+        """Load an image into the editor, optionally with a layer stack and the file's hash if known."""
+        # Detections for the old image are no use anymore
+        self.cancel_ai_redaction()
+        self._stop_autosave()
+        self.image_path = os.path.abspath(file_path)
+        self.image_hash = image_hash or project.file_hash(file_path)
+        self.project_path = None
+
+        # Only the on-screen size is decoded here, full resolution waits for detection or export
+        self.image_source = ImageSource(file_path)
+        self.image_pyramid = ImagePyramid(self.image_source)
+        self.fit_scale = self.display_scale = self.image_source.fit_scale(PREVIEW_MAX_DIM)
+        self.tiled_preview = TiledPreview(self.layer_manager, self.image_pyramid)
+        disp_w, disp_h = self.image_pyramid.scaled_size(self.display_scale)
         
         self.canvas.delete("all")
         self.canvas.config(width=min(disp_w, self.winfo_width()//2), height=min(disp_h, self.winfo_height()//2))
-        self.canvas_image_id = self.canvas.create_image(0, 0, anchor="nw", image=self.tk_image)
+        self.canvas_image_id = self.canvas.create_image(0, 0, anchor="nw")
         self.canvas.configure(scrollregion=(0, 0, disp_w, disp_h))
-        
-        if disp_h > self.canvas.winfo_height():
-            self.v_scroll.grid()
-        else:
-            self.v_scroll.grid_remove()
-        if disp_w > self.canvas.winfo_width():
-            self.h_scroll.grid()
-        else:
-            self.h_scroll.grid_remove()
+        self._update_scrollbars(disp_w, disp_h)
         
         self.layer_manager.clear_layers()
         self.selected_layer = None
         self.editor_tools.clear_selection()
         self.show_editor_panel()
+        if layers:
+            self._set_layers(layers)
+        self.update_live_preview()
+
+    def _set_layers(self, layers):
+        self.layer_manager.clear_layers()
+        for layer in layers:
+            self.layer_manager.add_layer(layer)
+        self.editor_tools.clear_selection()
+        self._refresh_region_list()
+
+    # ---------- projects and autosave ----------
+    def _autosave_path_for(self, image_hash):
+        return os.path.join(project.default_autosave_dir(), image_hash + project.PROJECT_EXTENSION)
+
+    def _start_autosave(self, path):
+        self._stop_autosave()
+        self.autosaver = project.Autosaver(path, self.image_path, self.image_hash)
+
+    def _stop_autosave(self):
+        if self.autosaver is not None:
+            self.autosaver.snapshot(self.layer_manager.layers)
+            self.autosaver.close()
+            self.autosaver = None
+
+    def _autosave_tick(self):
+        # Snapshotting is cheap and the writing happens on the autosaver's thread
+        if self.autosaver is not None:
+            self.autosaver.snapshot(self.layer_manager.layers)
+            error = self.autosaver.error
+            if error != self._autosave_error:
+                self._autosave_error = error
+                self.set_status(f"Autosave failed: {error}" if error else "Autosave resumed")
+        self.after(AUTOSAVE_MS, self._autosave_tick)
+
+    def set_status(self, text):
+        self.status_label.configure(text=text)
+
+    def save_project(self):
+        if self.image_source is None:
+            messagebox.showwarning("No Image", "Please upload an image first.")
+            return
+        save_path = filedialog.asksaveasfilename(
+            defaultextension=project.PROJECT_EXTENSION,
+            filetypes=[("BlankIt projects", "*" + project.PROJECT_EXTENSION)],
+        )
+        if not save_path:
+            return
+        try:
+            project.save_project(save_path, self.image_path, self.image_hash, self.layer_manager.layers)
+        except Exception as e:
+            self.set_status(f"Could not save project: {e}")
+            return
+        self.set_status(f"Project saved to {save_path}")
+        # Keep autosaving into the project from now on
+        self.project_path = save_path
+        self._start_autosave(save_path)
+
+    def open_project(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("BlankIt projects", "*" + project.PROJECT_EXTENSION)]
+        )
+        if not file_path:
+            return
+        try:
+            loaded = project.load_project(file_path)
+        except Exception as e:
+            messagebox.showerror("Open Project", f"Could not open project: {e}")
+            return
+
+        image_path = loaded.image_path
+        if not image_path or not os.path.exists(image_path):
+            messagebox.showinfo("Open Project", "The project's image was moved. Please locate it.")
+            image_path = filedialog.askopenfilename(filetypes=[("Image files", "*.png;*.jpg;*.jpeg;*.bmp")])
+            if not image_path:
+                return
+        # Hashed once, for the check and for the editor
+        image_hash = project.file_hash(image_path)
+        if not loaded.image_matches(image_hash) and not messagebox.askyesno(
+            "Open Project", "This image differs from the one the project was made on. Open anyway?"
+        ):
+            return
+
+        self.open_image_file(image_path, loaded.layers, image_hash)
+        self.project_path = file_path
+        self._start_autosave(file_path)
+
+    def _on_close(self):
+        self._stop_autosave()
+        self.quit()
+
+    @property
+    def original_image(self):
+        """Full resolution RGBA image, decoded on first access. Use image_source to test for an image."""
+        return self.image_source.full() if self.image_source is not None else None
 
     def show_editor_panel(self):
         # Clear previous widgets
@@ -217,152 +400,16 @@ class ImageRedactorApp(customtkinter.CTk):
 
         make_label('Regions:').pack(anchor='w', padx=8, pady=(8, 0))
 
-        # container for region rows
-        self.region_container = customtkinter.CTkScrollableFrame(
+        # Virtualized region list, only visible rows get widgets
+        self.region_list = RegionList(
             self.editor_inner,
-            fg_color=bg_color  # match background
+            self,
+            bg_color=bg_color,  # match background
+            details_color=bg_color,
+            text_color=text_color,
         )
-        self.region_container.pack(fill='both', expand=True, padx=8, pady=4)
-
-        # build rows
-        self._build_region_rows()
-
-    def _build_region_rows(self):
-        """Rebuild region rows with dropdown details."""
-        # Clear existing children
-        for child in self.region_container.winfo_children():
-            child.destroy()
-
-        scale = getattr(self, "display_scale", 1.0) or 1.0
-        shape_options = ['rectangle', 'circle', 'oval']
-        method_options = ['blur', 'redact', 'pixelate', 'none']
-
-        for idx, layer in enumerate(self.layer_manager.layers):
-            row_frame = customtkinter.CTkFrame(
-                self.region_container,
-                fg_color="transparent"
-            )
-            row_frame.pack(fill="x", pady=2)
-
-            # Header line: index + summary
-            summary = f"{idx+1}: {layer.shape} - {layer.method}"
-
-            # Determine if this index is selected
-            is_selected = (
-                hasattr(self.editor_tools, "selected_regions")
-                and idx in self.editor_tools.selected_regions
-            )
-
-            if is_selected:
-                row_fg = "#EBD494"   # highlighted background
-                row_text = "#1B1B1E" # light text
-            else:
-                row_fg = "#545E56"
-                row_text = "#1B1B1E"
-
-            header_btn = customtkinter.CTkButton(
-                row_frame,
-                text=summary,
-                fg_color=row_fg,
-                hover_color="#667761",
-                text_color=row_text,
-                command=lambda i=idx: self.editor_tools.select_region(i),
-            )
-            header_btn.pack(side="left", fill="x", expand=True, padx=(0, 4))
-
-            # Toggle button to show/hide details
-            toggle_btn = customtkinter.CTkButton(
-                row_frame,
-                text="⋯",
-                width=32,
-                fg_color="#545E56",
-                hover_color="#667761"
-            )
-            toggle_btn.pack(side="right")
-
-            # Details frame (start hidden)
-            details = customtkinter.CTkFrame(
-                self.region_container,
-                fg_color=self.theme_colors.get(
-                    'dark_bg' if customtkinter.get_appearance_mode() == 'Dark' else 'light_bg',
-                    "#1B1B1E"
-                )
-            )
-
-            # Coordinates (canvas units)
-            x1, y1, x2, y2 = layer.coords
-            cx1, cy1 = int(x1 * scale), int(y1 * scale)
-            cx2, cy2 = int(x2 * scale), int(y2 * scale)
-            coord_text = f"Coords: ({cx1}, {cy1}) → ({cx2}, {cy2})"
-
-            coord_label = customtkinter.CTkLabel(
-                details,
-                text=coord_text
-            )
-            coord_label.pack(anchor="w", padx=8, pady=(4, 0))
-
-            # Intensity only for blur/pixelate
-            if layer.method in ("blur", "pixelate"):
-                inten_label = customtkinter.CTkLabel(
-                    details,
-                    text=f"Intensity: {layer.intensity}"
-                )
-                inten_label.pack(anchor="w", padx=8, pady=(2, 0))
-
-            # Buttons row
-            btn_row = customtkinter.CTkFrame(details, fg_color="transparent")
-            btn_row.pack(fill="x", padx=4, pady=4)
-
-            copy_btn = customtkinter.CTkButton(
-                btn_row,
-                text="Copy",
-                width=60,
-                fg_color="#545E56",
-                hover_color="#667761",
-                command=lambda i=idx: self.editor_tools.copy_region(i)
-            )
-            copy_btn.pack(side="left", padx=4)
-
-            delete_btn = customtkinter.CTkButton(
-                btn_row,
-                text="Delete",
-                width=70,
-                fg_color="#545E56",
-                hover_color="#667761",
-                command=lambda i=idx: self.editor_tools.delete_region(i)
-            )
-            delete_btn.pack(side="left", padx=4)
-
-            # Shape dropdown - FIXED
-            shape_combo = customtkinter.CTkComboBox(
-                details,
-                values=shape_options,
-                width=100,
-                state="readonly",
-                command=lambda val, i=idx: self._on_shape_change(int(i), val)
-            )
-            shape_combo.set(layer.shape)
-            shape_combo.pack(anchor="w", padx=8, pady=(4, 0))
-
-            # Method dropdown - FIXED  
-            method_combo = customtkinter.CTkComboBox(
-                details,
-                values=method_options,
-                width=100,
-                state="readonly",
-                command=lambda val, i=idx: self._on_method_change(int(i), val)
-            )
-            method_combo.set(layer.method)
-            method_combo.pack(anchor="w", padx=8, pady=(4, 8))
-
-            # Toggle behavior - FIXED (moved inside loop, proper scope)
-            def toggle_details():
-                if details.winfo_ismapped():
-                    details.pack_forget()
-                else:
-                    details.pack(fill="x", padx=12, pady=(0, 4))
-
-            toggle_btn.configure(command=toggle_details)
+        self.region_list.pack(fill='both', expand=True, padx=8, pady=4)
+        self.region_list.refresh()
 
     def _on_mode_change(self, value: str):
         """Update editor tools mode when segmented button changes."""
@@ -372,59 +419,23 @@ class ImageRedactorApp(customtkinter.CTk):
             self.editor_tools.set_mode(value)
 
     def _on_shape_change(self, idx, new_shape):
-        """Delete and recreate layer with new shape."""
+        """Change the shape of a layer."""
         try:
             idx = int(idx)  # Double safety
             if 0 <= idx < len(self.layer_manager.layers):
-                layer = self.layer_manager.layers[idx]
-                coords = layer.coords
-                intensity = layer.intensity
-                size = layer.size
-                
-                # Delete old layer
-                del self.layer_manager.layers[idx]  # Direct list delete
-                self.editor_tools.clear_selection()
-                
-                # Create new layer
-                new_layer = Layer(
-                    shape=new_shape,
-                    coords=coords,
-                    method=layer.method,
-                    intensity=intensity,
-                    size=size
-                )
-                self.layer_manager.layers.append(new_layer)  # Direct append
-                
-                self.update_live_preview()
+                self.layer_manager.layers[idx].shape = new_shape
+                self.schedule_preview()
                 self._refresh_region_list()
         except (ValueError, IndexError):
             pass  # Silently ignore invalid indices
 
     def _on_method_change(self, idx, new_method):
-        """Delete and recreate layer with new method."""
+        """Change the redaction method of a layer."""
         try:
             idx = int(idx)
             if 0 <= idx < len(self.layer_manager.layers):
-                layer = self.layer_manager.layers[idx]
-                coords = layer.coords
-                intensity = layer.intensity
-                size = layer.size
-                
-                # Delete old layer
-                del self.layer_manager.layers[idx]
-                self.editor_tools.clear_selection()
-                
-                # Create new layer
-                new_layer = Layer(
-                    shape=layer.shape,
-                    coords=coords,
-                    method=new_method,
-                    intensity=intensity,
-                    size=size
-                )
-                self.layer_manager.layers.append(new_layer)
-                
-                self.update_live_preview()
+                self.layer_manager.layers[idx].method = new_method
+                self.schedule_preview()
                 self._refresh_region_list()
         except (ValueError, IndexError):
             pass
@@ -450,48 +461,92 @@ class ImageRedactorApp(customtkinter.CTk):
             self.editor_tools.select_region(idx)
 
     def _refresh_region_list(self):
-        """Rebuild the regions panel from LayerManager.layers."""
-        if hasattr(self, "region_container"):
-            self._build_region_rows()
+        """Update the regions panel from LayerManager.layers."""
+        if hasattr(self, "region_list"):
+            selected = self.editor_tools.selected_region
+            if selected is not None:
+                self.region_list.see(selected)
+            self.region_list.refresh()
 
     
     def update_live_preview(self):
         """Create and display the live preview image on the canvas."""
-        if self.original_image is None:
+        if self.image_source is None:
             return
 
         scale = getattr(self, "display_scale", 1.0) or 1.0
 
-        # Create a preview composited image scaled to display size
-        preview_img = self.layer_manager.create_preview(self.original_image, scale)
+        # Only the visible part of the canvas (plus a margin) is composited
+        left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        width = max(self.canvas.winfo_width(), int(self.canvas.cget("width")))
+        height = max(self.canvas.winfo_height(), int(self.canvas.cget("height")))
+        with span("live_preview", scale=round(scale, 3)):
+            preview_img, position = self.tiled_preview.render(scale, (left, top, left + width, top + height))
 
-        # Keep a reference to prevent GC
-        self.live_composite_image = preview_img
-        self.live_tk_image = ImageTk.PhotoImage(preview_img)
+            # Keep a reference to prevent GC
+            self.live_composite_image = preview_img
+            self.live_tk_image = ImageTk.PhotoImage(preview_img)
 
         # Update or create image on canvas
         if hasattr(self, 'canvas_image_id') and self.canvas_image_id:
             self.canvas.itemconfig(self.canvas_image_id, image=self.live_tk_image)
+            self.canvas.coords(self.canvas_image_id, *position)
         else:
-            self.canvas_image_id = self.canvas.create_image(0, 0, anchor="nw", image=self.live_tk_image)
+            self.canvas_image_id = self.canvas.create_image(*position, anchor="nw", image=self.live_tk_image)
 
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        # Zoomed to full resolution before it was decoded: a coarser level is on screen for now
+        if self._full_res_job is None and not self.image_pyramid.ready(scale):
+            self._full_res_job = self.after(FULL_RES_POLL_MS, self._check_full_res)
+
+    def _check_full_res(self):
+        self._full_res_job = None
+        if self.image_pyramid is None:
+            return
+        if self.image_pyramid.ready(self.display_scale):
+            self.schedule_preview()
+        else:
+            self._full_res_job = self.after(FULL_RES_POLL_MS, self._check_full_res)
 
     def _on_layer_change(self):
         """Called when layers change to update live preview."""
+        self.schedule_preview()
+
+    def schedule_preview(self):
+        """Mark the preview dirty and render it once, on the next idle frame.
+
+        Changes made before the render runs (queued motion events, slider
+        traces, several notifies from one click) are folded into that render.
+        """
+        if self._render_job is not None:
+            return
+        wait = FRAME_MS - (time.perf_counter() - self._last_render) * 1000
+        if wait > 0:
+            self._render_job = self.after(int(wait) + 1, self._render_scheduled_preview)
+        else:
+            self._render_job = self.after_idle(self._render_scheduled_preview)
+
+    def _render_scheduled_preview(self):
+        self._render_job = None
         self.update_live_preview()
+        # Rows and details update in place, so this is cheap enough per frame
+        if hasattr(self, "region_list"):
+            self.region_list.refresh()
+        self._last_render = time.perf_counter()
 
 
     def save_image(self):
-        if not self.original_image:
+        if self.image_source is None:
             messagebox.showwarning("No Image", "Please upload an image first.")
             return
         save_path = filedialog.asksaveasfilename(defaultextension=".png", 
                                                     filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg")])
         if not save_path:
             return
-        composite = self.layer_manager.merge_all(self.original_image)
-        composite.save(save_path)
+        with span("save_image", path=save_path):
+            with span("merge_all", layers=len(self.layer_manager.layers)):
+                composite = self.layer_manager.merge_all(self.original_image)
+            with span("encode"):
+                composite.save(save_path)
         messagebox.showinfo("Saved", "Redacted image saved successfully.")
 
     def _on_mousewheel(self, event):
@@ -510,14 +565,18 @@ class ImageRedactorApp(customtkinter.CTk):
                 delta = 120 if event.delta > 0 else -120
             except Exception:
                 delta = 0
+        if event.num == 4:
+            delta = 120
+        elif event.num == 5:
+            delta = -120
 
         ctrl = (event.state & 0x0004) != 0  # Check if Ctrl key pressed
 
         if ctrl:
             if delta > 0:
-                self._zoom_canvas(1.1)
+                self._zoom_canvas(1.1, event.x, event.y)
             else:
-                self._zoom_canvas(0.9)
+                self._zoom_canvas(1 / 1.1, event.x, event.y)
         else:
             # Vertical or horizontal scrolling
             try:
@@ -534,6 +593,53 @@ class ImageRedactorApp(customtkinter.CTk):
             except Exception:
                 pass
 
+    def _zoom_canvas(self, factor, x=None, y=None):
+        """Zoom the preview by `factor`, keeping the image point under canvas position (x, y) still."""
+        if self.image_source is None:
+            return
+        old = self.display_scale
+        scale = min(old * factor, ZOOM_MAX)
+        scale = max(scale, self.fit_scale / ZOOM_OUT_LIMIT)
+        if scale == old:
+            return
+
+        if x is None:
+            x, y = self.canvas.winfo_width() // 2, self.canvas.winfo_height() // 2
+        image_x = self.canvas.canvasx(x) / old
+        image_y = self.canvas.canvasy(y) / old
+
+        self.display_scale = scale
+        disp_w, disp_h = self.image_pyramid.scaled_size(scale)
+        self.canvas.configure(scrollregion=(0, 0, disp_w, disp_h))
+        self._update_scrollbars(disp_w, disp_h)
+        self.canvas.xview_moveto(max(0.0, image_x * scale - x) / disp_w)
+        self.canvas.yview_moveto(max(0.0, image_y * scale - y) / disp_h)
+
+        # The preview is rendered on the next frame, so a fast wheel spin renders once
+        self.schedule_preview()
+        self.editor_tools.draw_selection_outline()
+        if hasattr(self, "region_list"):
+            self.region_list.refresh()
+
+    def _on_canvas_xview(self, first, last):
+        # Every scroll, whatever caused it, reveals a different part of the image
+        self.h_scroll.set(first, last)
+        self.schedule_preview()
+
+    def _on_canvas_yview(self, first, last):
+        self.v_scroll.set(first, last)
+        self.schedule_preview()
+
+    def _update_scrollbars(self, disp_w, disp_h):
+        if disp_h > self.canvas.winfo_height():
+            self.v_scroll.grid()
+        else:
+            self.v_scroll.grid_remove()
+        if disp_w > self.canvas.winfo_width():
+            self.h_scroll.grid()
+        else:
+            self.h_scroll.grid_remove()
+
     def _on_editor_mousewheel(self, event):
         try:
             delta = int(event.delta / 120)
@@ -567,80 +673,171 @@ class ImageRedactorApp(customtkinter.CTk):
         # Reflect any UI updates needed on mode change (e.g., editor redraw)
         self.show_editor_panel()
 
-    def run_ai_redaction(self):
-        """Run AI detection and automatically add detected regions as layers."""
-        import sys
-        import os
+    def _start_backend_warm_up(self):
+        threading.Thread(target=self._warm_up_backend, name="warm-up", daemon=True).start()
 
-        temp_path = None
-        if self.original_image is None:
+    @staticmethod
+    def _warm_up_backend():
+        """Import the detection backend and build its models, off the Tk thread."""
+        start = time.perf_counter()
+        try:
+            with span("import_backend"):
+                import main as backend
+            imported = time.perf_counter() - start
+            times = backend.warm_up()
+        except ImportError as e:
+            # run_ai_redaction reports it if the user asks for detection
+            print(f"Detection backend not available: {e}")
+            return
+        print(f"Detection backend ready in {time.perf_counter() - start:.2f}s: "
+              f"main {imported:.2f}s, {backend.format_times(times)}")
+
+    def run_ai_redaction(self):
+        """Start AI detection on a background thread; results are added as layers when it finishes."""
+        if self.image_source is None:
             messagebox.showwarning("No Image", "Please upload an image first.")
             return
+        if self._ai_cancel is not None:
+            return  # already running
 
         try:
-            # Add 'src' folder to sys.path for import
-            sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
-            from main import faces_boxes, plates_boxes  # Import backend functions
-
-            # Save temp image path for AI processing
-            temp_path = os.path.abspath("temp_ai_input.png")
-            self.original_image.save(temp_path)
+            with span("import_backend"):
+                import main as backend  # Import backend functions (src/ is on sys.path)
+            if backend.get_cache() is None:
+                # Reopening an image or re-running detection reuses earlier results
+                backend.enable_cache()
+        except ImportError:
+            messagebox.showerror(
+                "Missing Backend", "main.py not found or missing dependencies (face_recognition, opencv-python)"
+            )
+            return
 
-            # Run face detection
-            print("Running face detection...")
-            faces_img_cv, face_coords = faces_boxes(temp_path)
+        self._ai_cancel = threading.Event()
+        self._ai_events = queue.Queue()
+        worker = threading.Thread(
+            target=self._ai_worker,
+            args=(backend, self.image_source, self._ai_cancel, self._ai_events),
+            daemon=True,
+        )
 
-            # Run plate detection on face-processed image
-            print("Running license plate detection...")
-            _, plate_coords = plates_boxes(faces_img_cv)
+        self.btn_ai.configure(state="disabled")
+        self.ai_cancel_button.configure(state="normal")
+        self.ai_progress_bar.set(0)
+        self.ai_progress_label.configure(text="Starting...")
+        self.ai_progress_frame.pack(side="left", padx=5)
 
-            # Combine all detected regions
-            all_regions = face_coords + plate_coords
+        worker.start()
+        self.after(50, self._poll_ai_redaction)
 
-            if not all_regions:
-                messagebox.showinfo("AI Detection", "No sensitive regions detected.")
-                return
+    @staticmethod
+    def _ai_worker(backend, source, cancel, events):
+        """Runs off the Tk thread, reports back through the events queue only."""
+        import numpy as np
 
-            # Clear existing layers
-            self.layer_manager.clear_layers()
-            self.editor_tools.clear_selection()
+        def progress(stage):
+            return lambda done, total: events.put(("progress", stage, done, total))
 
-            # Add each detected region as a Layer
-            default_method = self.method_var.get() if hasattr(self, "method_var") else "redact"
-            default_shape = self.shape_var.get() if hasattr(self, "shape_var") else "rectangle"
+        try:
+            with span("run_ai_redaction"):
+                # Hand the decoded pixels straight to the detectors, no temp file
+                print("Running face detection...")
+                with span("decode"):
+                    image = source.full()  # decodes full resolution here, off the Tk thread
+                with span("to_rgb"):
+                    rgb = np.asarray(image.convert("RGB"))
+                face_coords = backend.find_faces(rgb, progress=progress("faces"), cancel=cancel,
+                                                 **AI_DETECTION_OPTIONS['face'])
+                del rgb
+
+                # Run plate detection on the grayscale pixels
+                print("Running license plate detection...")
+                with span("to_gray"):
+                    gray = np.asarray(image.convert("L"))
+                plate_coords = backend.find_plates(gray, progress=progress("plates"), cancel=cancel,
+                                                   **AI_DETECTION_OPTIONS['plate'])
+
+            events.put(("done", face_coords + plate_coords))
+        except backend.DetectionCancelled:
+            events.put(("cancelled",))
+        except Exception as e:
+            events.put(("error", str(e)))
 
-            for coord_pair in all_regions:
-                (left, top), (right, bottom) = coord_pair
-                # Convert to (x1, y1, x2, y2) format for Layer
-                coords = (left, top, right, bottom)
+    def _poll_ai_redaction(self):
+        """Drain worker events on the Tk thread and reschedule until the worker is done."""
+        if self._ai_events is None:
+            return
+        stages = ("faces", "plates")
+        try:
+            while True:
+                event = self._ai_events.get_nowait()
+                kind = event[0]
+                if kind == "progress":
+                    _, stage, done, total = event
+                    if not self._ai_cancel.is_set():
+                        self.ai_progress_label.configure(text=f"{stage.title()}: {done}/{total}")
+                    fraction = done / float(total) if total else 1.0
+                    self.ai_progress_bar.set((stages.index(stage) + fraction) / len(stages))
+                    continue
+
+                cancelled = self._ai_cancel.is_set()
+                self._end_ai_redaction()
+                if kind == "done" and not cancelled:
+                    self._apply_ai_regions(event[1])
+                elif kind == "error":
+                    messagebox.showerror("AI Error", f"AI detection failed: {event[1]}")
+                return
+        except queue.Empty:
+            pass
+        self.after(50, self._poll_ai_redaction)
+
+    def cancel_ai_redaction(self):
+        """Ask the running detection to stop at its next tile."""
+        if self._ai_cancel is not None:
+            self._ai_cancel.set()
+            self.ai_cancel_button.configure(state="disabled")
+            self.ai_progress_label.configure(text="Cancelling...")
+
+    def _end_ai_redaction(self):
+        self._ai_cancel = None
+        self._ai_events = None
+        self.ai_progress_frame.pack_forget()
+        self.btn_ai.configure(state="normal")
+
+    def _apply_ai_regions(self, all_regions):
+        """Replace the layers with the detected regions."""
+        if not all_regions:
+            messagebox.showinfo("AI Detection", "No sensitive regions detected.")
+            return
 
-                new_layer = Layer(
-                    shape=default_shape,
-                    coords=coords,
-                    method=default_method,
-                    intensity=10,
-                    size=0,
-                )
-                self.layer_manager.add_layer(new_layer)
+        # Clear existing layers
+        self.layer_manager.clear_layers()
+        self.editor_tools.clear_selection()
 
-            print(f"AI added {len(all_regions)} detected regions as editable layers")
-            messagebox.showinfo("AI Detection", f"Added {len(all_regions)} detected regions!")
+        # Add each detected region as a Layer
+        default_method = self.method_var.get() if hasattr(self, "method_var") else "redact"
+        default_shape = self.shape_var.get() if hasattr(self, "shape_var") else "rectangle"
+
+        for coord_pair in all_regions:
+            (left, top), (right, bottom) = coord_pair
+            # Convert to (x1, y1, x2, y2) format for Layer
+            coords = (left, top, right, bottom)
+
+            new_layer = Layer(
+                shape=default_shape,
+                coords=coords,
+                method=default_method,
+                intensity=10,
+                size=0,
+            )
+            self.layer_manager.add_layer(new_layer)
 
-            # Refresh UI and live preview
-            self.show_editor_panel()
-            self.update_live_preview()
+        print(f"AI added {len(all_regions)} detected regions as editable layers")
+        messagebox.showinfo("AI Detection", f"Added {len(all_regions)} detected regions!")
 
-        except ImportError:
-            messagebox.showerror(
-                "Missing Backend", "main.py not found or missing dependencies (face_recognition, opencv-python)"
-            )
-        except Exception as e:
-            messagebox.showerror("AI Error", f"AI detection failed: {str(e)}")
-        finally:
-            # Cleanup temp file safely
-            if temp_path and os.path.exists(temp_path):
-                os.remove(temp_path)
+        # Refresh UI and live preview
+        self.show_editor_panel()
+        self.schedule_preview()
 
 if __name__ == "__main__":
     app = ImageRedactorApp()
-    app.mainloop()
+    app.mainloop()
\ No newline at end of file
@@ -0,0 +1,193 @@
+import atexit
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import numpy as np
+from PIL import Image
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+IMAGES_DIR = os.path.join(ROOT, "images")
+sys.path[:0] = [os.path.join(ROOT, "src"), os.path.join(ROOT, "Front-End")]
+
+# name -> (setup, repeat). setup() runs once, untimed, and returns the function to time.
+CASES = {}
+
+def case(name, repeat=20):
+    def register(setup):
+        CASES[name] = (setup, repeat)
+        return setup
+    return register
+
+def fixtures():
+    return sorted(name for name in os.listdir(IMAGES_DIR)
+                  if name.lower().endswith((".png", ".jpg", ".jpeg", ".bmp")))
+
+def synthetic_image(width, height, seed=0):
+    """Deterministic RGBA test image: smooth gradients plus noise, so filters and detectors do real work."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 200, width).astype(np.uint8)
+    y = np.linspace(0, 200, height).astype(np.uint8)[:, None]
+    pixels = np.empty((height, width, 4), dtype=np.uint8)
+    pixels[..., 0] = x
+    pixels[..., 1] = y
+    pixels[..., 2] = x // 2 + y // 2
+    pixels[..., 3] = 255
+    # Row by row keeps the temporary noise small for panorama sizes
+    for row in pixels:
+        row[:, :3] += rng.integers(0, 48, (width, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+def random_layers(count, width, height, seed=0):
+    from layer_manager import Layer
+    rng = random.Random(seed)
+    layers = []
+    for _ in range(count):
+        w, h = rng.randint(40, 400), rng.randint(40, 400)
+        x, y = rng.randint(0, width - w), rng.randint(0, height - h)
+        layers.append(Layer(rng.choice(["rectangle", "oval"]), (x, y, x + w, y + h),
+                            rng.choice(["blur", "pixelate", "redact"]), rng.randint(4, 30)))
+    return layers
+
+# ---------- startup ----------
+def _command_case(*args):
+    # A fresh interpreter each run, so nothing is imported yet
+    def setup():
+        command = [sys.executable, *args]
+        return lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL, cwd=ROOT)
+    return setup
+
+case("startup[main.py --help]", repeat=10)(_command_case(os.path.join(ROOT, "src", "main.py"), "--help"))
+case("startup[import main]", repeat=10)(_command_case("-c", "import sys; sys.path.insert(0, 'src'); import main"))
+
+@case("startup[main.warm_up]", repeat=5)
+def _warm_up():
+    import detectors
+    import main
+
+    def run():
+        detectors.unload()
+        main.warm_up()
+    return run
+
+# ---------- detection ----------
+def _faces_case(path):
+    def setup():
+        import main
+        return lambda: main.faces_boxes(path)
+    return setup
+
+def _plates_case(load):
+    def setup():
+        import main
+        image_cv = load()
+        return lambda: main.plates_boxes(image_cv.copy())
+    return setup
+
+def _load_bgr(path):
+    import cv2
+    return lambda: cv2.imread(path)
+
+def _synthetic_bgr(width, height):
+    return lambda: np.ascontiguousarray(np.asarray(synthetic_image(width, height).convert("RGB"))[..., ::-1])
+
+for _name in fixtures():
+    _path = os.path.join(IMAGES_DIR, _name)
+    case(f"faces_boxes[{_name}]", repeat=5)(_faces_case(_path))
+    case(f"plates_boxes[{_name}]", repeat=10)(_plates_case(_load_bgr(_path)))
+case("plates_boxes[synthetic 4000x3000]", repeat=5)(_plates_case(_synthetic_bgr(4000, 3000)))
+
+@case("AllowList.match[20 faces vs 10000 known]", repeat=50)
+def _allow_list_match():
+    from allowlist import AllowList
+    rng = np.random.default_rng(0)
+    allow_list = AllowList(rng.normal(0, 0.1, (10000, 128)), [f"person {i}" for i in range(10000)])
+    faces = rng.normal(0, 0.1, (20, 128))
+    return lambda: allow_list.match(faces)
+
+# ---------- compositing ----------
+def _apply_case(method, shape):
+    def setup():
+        from layer_manager import Layer
+        image = synthetic_image(4000, 3000)
+        layer = Layer(shape, (1000, 1000, 1600, 1500), method, 20)
+        return lambda: layer.apply(image)
+    return setup
+
+for _method in ("blur", "pixelate", "redact"):
+    for _shape in ("rectangle", "oval"):
+        case(f"Layer.apply[{_method}, {_shape}, 4000x3000]")(_apply_case(_method, _shape))
+
+def _merge_case(count):
+    def setup():
+        from layer_manager import LayerManager
+        image = synthetic_image(4000, 3000)
+        manager = LayerManager()
+        for layer in random_layers(count, *image.size):
+            manager.add_layer(layer)
+        return lambda: manager.merge_all(image)
+    return setup
+
+for _count in (10, 100, 1000):
+    case(f"merge_all[{_count} layers, 4000x3000]", repeat=10 if _count < 1000 else 3)(_merge_case(_count))
+
+def _saved_pyramid(image, name):
+    from image_loader import ImageSource, ImagePyramid
+    directory = tempfile.mkdtemp(prefix="blankit-bench-")
+    atexit.register(shutil.rmtree, directory, True)
+    path = os.path.join(directory, name)
+    image.save(path)
+    return ImagePyramid(ImageSource(path))
+
+def _preview_with_layers(count):
+    from layer_manager import LayerManager
+    from tiled_preview import TiledPreview
+    manager = LayerManager()
+    for layer in random_layers(count, 4000, 3000):
+        manager.add_layer(layer)
+    preview = TiledPreview(manager, _saved_pyramid(synthetic_image(4000, 3000), "photo.png"))
+    return manager, preview
+
+@case("TiledPreview.render[cold, 100 layers, 4000x3000 -> 0.2]", repeat=10)
+def _preview_cold():
+    manager, preview = _preview_with_layers(100)
+    preview.render(0.2, (0, 0, 800, 600))  # builds the pyramid level once, outside the timing
+
+    def run():
+        preview.invalidate()
+        preview.render(0.2, (0, 0, 800, 600))
+    return run
+
+@case("TiledPreview.render[drag one of 100 layers, 4000x3000 -> 0.2]", repeat=50)
+def _preview_drag():
+    manager, preview = _preview_with_layers(100)
+    preview.render(0.2, (0, 0, 800, 600))
+    layer = manager.layers[50]
+    steps = iter(range(10 ** 9))
+
+    def run():
+        x1, y1, x2, y2 = layer.coords
+        dx = 5 if next(steps) % 2 else -5
+        layer.coords = (x1 + dx, y1, x2 + dx, y2)
+        preview.render(0.2, (0, 0, 800, 600))
+    return run
+
+@case("TiledPreview.render[scroll 30000x2000 panorama at 100%]", repeat=20)
+def _tiled_scroll():
+    from layer_manager import LayerManager
+    from tiled_preview import TiledPreview
+    pyramid = _saved_pyramid(synthetic_image(30000, 2000), "panorama.png")
+    manager = LayerManager()
+    for layer in random_layers(300, 30000, 2000):
+        manager.add_layer(layer)
+    preview = TiledPreview(manager, pyramid)
+    positions = iter(range(0, 10 ** 9, 400))
+
+    def run():
+        # Each step scrolls right by about a tile and a half, so new tiles are always due
+        x = next(positions) % (30000 - 1200)
+        preview.render(1.0, (x, 0, x + 1200, 800))
+    return run
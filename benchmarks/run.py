@@ -0,0 +1,167 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# resource is Unix only, peak memory is just not reported on Windows
+try:
+    import resource
+except ImportError:
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+WARMUP_RUNS = 1
+
+def percentile(sorted_times, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, math.ceil(fraction * len(sorted_times)))
+    return sorted_times[rank - 1]
+
+def _reset_peak():
+    """Start a new peak RSS measurement so setup does not count. Linux only."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Elsewhere the peak covers the whole process, setup included
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _run_case(name, repeat):
+    """Runs in a fresh process, so the peak memory belongs to this case alone."""
+    import cases
+    setup, default_repeat = cases.CASES[name]
+    repeat = repeat or default_repeat
+    # Detection helpers print progress, keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            run = setup()
+            for _ in range(WARMUP_RUNS):
+                run()
+        except ImportError as e:
+            # e.g. dlib is not installed, the other cases still run
+            return {"name": name, "skipped": str(e)}
+        _reset_peak()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+
+    times.sort()
+    return {
+        "name": name,
+        "runs": repeat,
+        "min": times[0],
+        "median": percentile(times, 0.5),
+        "p95": percentile(times, 0.95),
+        "peak_mb": _peak_rss_mb(),
+    }
+
+def compare(result, baseline, threshold):
+    """Reasons this result regressed against its baseline entry, if any."""
+    reasons = []
+    if result.get("skipped") or not baseline or baseline.get("skipped"):
+        return reasons
+    if result["median"] > baseline["median"] * (1 + threshold):
+        reasons.append(f"median {result['median'] * 1000:.2f}ms vs {baseline['median'] * 1000:.2f}ms")
+    if result["peak_mb"] and baseline.get("peak_mb") and result["peak_mb"] > baseline["peak_mb"] * (1 + threshold):
+        reasons.append(f"peak {result['peak_mb']:.0f}MB vs {baseline['peak_mb']:.0f}MB")
+    return reasons
+
+def _format(result):
+    if result.get("skipped"):
+        return f"{result['name']:<60} skipped ({result['skipped']})"
+    peak = f"{result['peak_mb']:8.0f}MB" if result["peak_mb"] is not None else "       n/a"
+    return (f"{result['name']:<60} {result['min'] * 1000:9.2f} {result['median'] * 1000:9.2f} "
+            f"{result['p95'] * 1000:9.2f} {peak}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark BlankIt's detection and compositing hot paths.")
+    parser.add_argument("-k", "--filter", default="",
+                        help="only run cases whose name contains this text")
+    parser.add_argument("-n", "--repeat", type=int, default=0,
+                        help="timed runs per case (default: per case)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="baseline file to compare against (default: benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write the results as the new baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown before a case counts as a regression (default: 0.25 = 25%%)")
+    parser.add_argument("--json", metavar="PATH",
+                        help="also write the results to this file")
+    parser.add_argument("--list", action="store_true",
+                        help="list the cases and exit")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    sys.path.insert(0, HERE)
+    import cases
+    names = [name for name in cases.CASES if args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    print(f"{'case':<60} {'min ms':>9} {'median':>9} {'p95':>9} {'peak':>10}")
+    results = {}
+    regressions = []
+    # One fresh process per case: no shared caches or warm allocator, and a clean peak
+    context = multiprocessing.get_context("spawn")
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(_run_case, name, args.repeat).result()
+        results[name] = result
+        reasons = compare(result, baseline.get(name), args.threshold)
+        print(_format(result) + ("   REGRESSED: " + ", ".join(reasons) if reasons else ""))
+        if reasons:
+            regressions.append(name)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to: {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
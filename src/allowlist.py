@@ -0,0 +1,148 @@
+import argparse
+import os
+import numpy as np
+import detectors
+
+# Same cut-off face_recognition.compare_faces uses, lower is stricter
+DEFAULT_TOLERANCE = 0.6
+ENCODING_SIZE = 128
+
+def face_encodings(image, boxes, jitters=1):
+    """128-d encodings of the faces at `boxes` in an RGB array, as an (n, 128) float32 matrix.
+
+    Same model and landmarks face_recognition.face_encodings uses, with all
+    faces of the image passed to dlib in one call.
+    """
+    import dlib
+    if not boxes:
+        return np.empty((0, ENCODING_SIZE), np.float32)
+    predictor = detectors.get("face_landmarks")
+    encoder = detectors.get("face_encoder")
+    shapes = dlib.full_object_detections()
+    for (left, top), (right, bottom) in boxes:
+        shapes.append(predictor(image, dlib.rectangle(int(left), int(top), int(right), int(bottom))))
+    return np.array(encoder.compute_face_descriptor(image, shapes, jitters), dtype=np.float32)
+
+class AllowList:
+    """Known faces that are left unblurred.
+
+    The encodings live in one (N, 128) matrix with their squared norms
+    precomputed, so matching k detected faces is a single (k, N) distance
+    computation however many faces are known.
+    """
+
+    def __init__(self, encodings=None, names=None):
+        self.encodings = np.empty((0, ENCODING_SIZE), np.float32)
+        self.names = np.empty(0, dtype=str)
+        self._norms = np.empty(0, np.float32)
+        if encodings is not None:
+            self.add(encodings, names)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["encodings"], data["names"])
+
+    def save(self, path):
+        # Through a file object, so np.savez keeps the name as given
+        with open(path, "wb") as f:
+            np.savez(f, encodings=self.encodings, names=self.names)
+
+    def add(self, encodings, names):
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        if len(names) != len(encodings):
+            raise ValueError(f"Got {len(encodings)} encoding(s) but {len(names)} name(s)")
+        self.encodings = np.concatenate([self.encodings, encodings])
+        self.names = np.concatenate([self.names, np.asarray(names, dtype=str)])
+        self._norms = np.einsum("ij,ij->i", self.encodings, self.encodings)
+
+    def distances(self, encodings):
+        """Euclidean distance from each of the given encodings to every known one, (k, N)."""
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        # |a - b|^2 = |a|^2 + |b|^2 - 2 a.b, the a.b part is one matrix product
+        squared = (np.einsum("ij,ij->i", encodings, encodings)[:, None] + self._norms[None, :]
+                   - 2.0 * encodings @ self.encodings.T)
+        return np.sqrt(np.maximum(squared, 0.0))
+
+    def match(self, encodings, tolerance=DEFAULT_TOLERANCE):
+        """Index of the closest known face for each encoding, or -1 when none is within tolerance."""
+        count = len(np.asarray(encodings).reshape(-1, ENCODING_SIZE))
+        if not len(self) or not count:
+            return np.full(count, -1)
+        distances = self.distances(encodings)
+        best = distances.argmin(axis=1)
+        return np.where(distances[np.arange(count), best] <= tolerance, best, -1)
+
+    def known(self, image, boxes, tolerance=DEFAULT_TOLERANCE):
+        """Names of the faces at `boxes` in an RGB array, None for the ones not on the list."""
+        if not len(self) or not boxes:
+            return [None] * len(boxes)
+        return [str(self.names[i]) if i >= 0 else None
+                for i in self.match(face_encodings(image, boxes), tolerance)]
+
+def _name_for(path, root):
+    """alice.jpg -> alice, and alice/1.jpg -> alice for a folder per person."""
+    relative = os.path.relpath(path, root)
+    folder = os.path.dirname(relative)
+    return folder.split(os.sep)[0] if folder else os.path.splitext(relative)[0]
+
+def build(inputs, jitters=1):
+    """AllowList from photos that each show one known person."""
+    import main as backend
+    encodings, names = [], []
+    for item in inputs:
+        root = item if os.path.isdir(item) else None
+        for src, _ in backend.collect_images([item], ""):
+            image = backend.load_image_file(src)
+            boxes = backend.find_faces(image)
+            if len(boxes) != 1:
+                print(f"Skipped {src}: {len(boxes)} faces found, expected one")
+                continue
+            name = _name_for(src, root or os.path.dirname(src))
+            encodings.append(face_encodings(image, boxes, jitters))
+            names.append(name)
+            print(f"Added {name} from {src}")
+    # One concatenation at the end, not one per photo
+    return AllowList(np.concatenate(encodings) if encodings else None, names)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the list of known faces BlankIt leaves unblurred.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="encode photos of known people into a list")
+    build_parser.add_argument("inputs", nargs="+",
+                              help="photos with one face each, or directories of them "
+                                   "(named after the file, or after its folder inside a directory)")
+    build_parser.add_argument("-o", "--output", required=True, help="list file to write (.npz)")
+    build_parser.add_argument("--append", action="store_true", help="add to the list in --output if it exists")
+    build_parser.add_argument("--jitters", type=int, default=1,
+                              help="re-sample each face this many times for a steadier encoding (default: 1)")
+    show_parser = commands.add_parser("show", help="print the names in a list")
+    show_parser.add_argument("path")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "show":
+        allow_list = AllowList.load(args.path)
+        for name in allow_list.names:
+            print(name)
+        print(f"{len(allow_list)} known face(s)")
+        return 0
+
+    allow_list = build(args.inputs, args.jitters)
+    if args.append and os.path.exists(args.output):
+        existing = AllowList.load(args.output)
+        existing.add(allow_list.encodings, allow_list.names)
+        allow_list = existing
+    if not len(allow_list):
+        print("No faces added")
+        return 1
+    allow_list.save(args.output)
+    print(f"Saved {len(allow_list)} known face(s) to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+# Helpers for detection boxes in the ((left, top), (right, bottom)) format
+# returned by find_faces and find_plates.
+
+def scale_box(box, factor):
+    (left, top), (right, bottom) = box
+    return ((int(left * factor), int(top * factor)),
+            (int(round(right * factor)), int(round(bottom * factor))))
+
+def offset_box(box, dx, dy):
+    (left, top), (right, bottom) = box
+    return ((left + dx, top + dy), (right + dx, bottom + dy))
+
+def expand_box(box, margin, width, height):
+    """Grow a box by `margin` (a fraction of its size) on every side, clamped to the image."""
+    (left, top), (right, bottom) = box
+    pad_x = int((right - left) * margin)
+    pad_y = int((bottom - top) * margin)
+    return ((max(0, left - pad_x), max(0, top - pad_y)),
+            (min(width, right + pad_x), min(height, bottom + pad_y)))
+
+def area(box):
+    (left, top), (right, bottom) = box
+    return max(0, right - left) * max(0, bottom - top)
+
+def intersection(a, b):
+    """Area shared by two boxes."""
+    (al, at), (ar, ab) = a
+    (bl, bt), (br, bb) = b
+    return area(((max(al, bl), max(at, bt)), (min(ar, br), min(ab, bb))))
+
+def iou(a, b):
+    """Intersection over union of two boxes."""
+    inter = intersection(a, b)
+    if inter == 0:
+        return 0.0
+    return inter / float(area(a) + area(b) - inter)
+
+def merge_boxes(boxes, threshold=0.5, containment=0.8):
+    """Non-maximum suppression for boxes without scores, larger boxes win.
+
+    A box is dropped when its IoU with a kept box is above `threshold`, or when
+    more than `containment` of its area lies inside a kept box (a face cut in
+    half by a tile seam next to the whole face found in the neighbouring tile).
+    """
+    kept = []
+    for box in sorted(boxes, key=area, reverse=True):
+        size = area(box)
+        duplicate = False
+        for other in kept:
+            inter = intersection(box, other)
+            if inter == 0:
+                continue
+            if inter / float(size + area(other) - inter) > threshold or (size and inter / float(size) > containment):
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(box)
+    return kept
+
+def tile_grid(width, height, tile_size, overlap):
+    """Split a width x height image into overlapping (left, top, right, bottom) tiles.
+
+    `overlap` is the number of pixels neighbouring tiles share. The last row and
+    column are pushed back so every tile is full size when the image allows it.
+    """
+    step = max(1, tile_size - overlap)
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)
+        return positions
+
+    return [(x, y, min(width, x + tile_size), min(height, y + tile_size))
+            for y in starts(height) for x in starts(width)]
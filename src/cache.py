@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Bump when the stored format or the meaning of the boxes changes
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DATABASE_NAME = "detections.sqlite"
+
+# One row per entry, plus a single row holding the total size of the entries,
+# updated with every write so eviction never has to add them up
+_SCHEMA = """
+PRAGMA journal_mode=WAL;
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    boxes TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+CREATE TABLE IF NOT EXISTS usage (bytes INTEGER NOT NULL);
+INSERT INTO usage SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM usage);
+"""
+
+def default_cache_dir():
+    return os.environ.get("BLANKIT_CACHE_DIR",
+                          os.path.join(os.path.expanduser("~"), ".cache", "blankit", "detections"))
+
+class DetectionCache:
+    """On-disk cache of detection boxes, keyed by decoded pixels plus detector parameters.
+
+    Entries live in one SQLite table in `directory`. Hits refresh the entry's
+    last use and the least recently used entries are evicted once the stored
+    boxes and keys add up to more than max_bytes, so it behaves as a
+    size-bounded LRU. Safe to share between processes: each write is one
+    transaction, and each process opens its own connection.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None  # process that opened _conn, a forked child opens its own
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(pixels, detector, params):
+        """Hash of the pixel buffer, its shape and dtype, and the detector settings."""
+        digest = hashlib.blake2b(digest_size=20)
+        header = {"version": CACHE_VERSION, "detector": detector, "params": params,
+                  "shape": list(pixels.shape), "dtype": str(pixels.dtype)}
+        digest.update(json.dumps(header, sort_keys=True).encode())
+        if pixels.flags.c_contiguous:
+            digest.update(memoryview(pixels).cast("B"))
+        else:
+            digest.update(pixels.tobytes())
+        return digest.hexdigest()
+
+    def _connection(self):
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(os.path.join(self.directory, DATABASE_NAME), timeout=30,
+                                   isolation_level=None, check_same_thread=False)
+            conn.executescript(_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key):
+        """Return the cached boxes for `key`, or None."""
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute("SELECT boxes FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+            data = json.loads(row[0])
+        except (sqlite3.Error, ValueError):
+            return None
+        return [(tuple(top_left), tuple(bottom_right)) for top_left, bottom_right in data]
+
+    def put(self, key, boxes):
+        payload = json.dumps([[list(a), list(b)] for a, b in boxes])
+        size = len(key) + len(payload)
+        try:
+            with self._lock, self._connection() as conn:
+                # Commits on leaving the block, rolls back on an error
+                conn.execute("BEGIN IMMEDIATE")
+                old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                             (key, payload, size, time.time()))
+                total = self._add_usage(conn, size - (old[0] if old else 0))
+                if total > self.max_bytes:
+                    self._evict(conn, total)
+        except sqlite3.Error:
+            # A cache that cannot be written is just a slower cache
+            pass
+
+    @staticmethod
+    def _add_usage(conn, delta):
+        conn.execute("UPDATE usage SET bytes = bytes + ?", (delta,))
+        return conn.execute("SELECT bytes FROM usage").fetchone()[0]
+
+    def _evict(self, conn, total):
+        """Remove least recently used entries until the cache is at 90% of max_bytes."""
+        target = self.max_bytes * 0.9
+        evicted, freed = [], 0
+        oldest = conn.execute("SELECT key, size FROM entries ORDER BY used")
+        for key, size in oldest:
+            if total - freed <= target:
+                break
+            evicted.append((key,))
+            freed += size
+        oldest.close()
+        conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self._add_usage(conn, -freed)
+
+    def clear(self):
+        try:
+            with self._lock, self._connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM entries")
+                conn.execute("UPDATE usage SET bytes = 0")
+        except sqlite3.Error:
+            pass
@@ -0,0 +1,83 @@
+import threading
+import time
+from tracing import span
+
+# Registry of detector loaders, keyed by name. Models are built on first use
+# and then cached for the life of the process.
+_loaders = {}
+_models = {}
+_load_times = {}
+_lock = threading.Lock()
+
+def register(name, loader):
+    """Register a zero-argument function that builds the detector called `name`."""
+    with _lock:
+        _loaders[name] = loader
+        _models.pop(name, None)
+
+def get(name):
+    """Return the cached detector called `name`, loading it if needed."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        # Another thread may have loaded it while we waited
+        if name not in _models:
+            if name not in _loaders:
+                raise KeyError(f"Unknown detector: {name}")
+            start = time.perf_counter()
+            with span("load_model", name=name):
+                _models[name] = _loaders[name]()
+            _load_times[name] = time.perf_counter() - start
+        return _models[name]
+
+def warm_up(names=None):
+    """Load the given detectors (all registered ones by default) ahead of time."""
+    for name in (names if names is not None else list(_loaders)):
+        get(name)
+    return dict(_load_times)
+
+def unload(names=None):
+    """Drop the given detectors (all by default) so they are rebuilt on next use."""
+    with _lock:
+        for name in (names if names is not None else list(_models)):
+            _models.pop(name, None)
+            _load_times.pop(name, None)
+
+def is_loaded(name):
+    return name in _models
+
+def load_times():
+    """Seconds spent building each currently loaded detector."""
+    return dict(_load_times)
+
+def _load_face_hog():
+    import dlib
+    return dlib.get_frontal_face_detector()
+
+def _load_face_cnn():
+    import dlib
+    import face_recognition_models
+    return dlib.cnn_face_detection_model_v1(face_recognition_models.cnn_face_detector_model_location())
+
+# Used by allowlist.py, the same models face_recognition.face_encodings uses
+def _load_face_landmarks():
+    import dlib
+    import face_recognition_models
+    return dlib.shape_predictor(face_recognition_models.pose_predictor_five_point_model_location())
+
+def _load_face_encoder():
+    import dlib
+    import face_recognition_models
+    return dlib.face_recognition_model_v1(face_recognition_models.face_recognition_model_location())
+
+def _load_plate():
+    import cv2
+    return cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_russian_plate_number.xml')
+
+register("face_hog", _load_face_hog)
+register("face_cnn", _load_face_cnn)
+register("face_landmarks", _load_face_landmarks)
+register("face_encoder", _load_face_encoder)
+register("plate", _load_plate)
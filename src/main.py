@@ -1,61 +1,362 @@
-import cv2
+import argparse
+import glob
+import multiprocessing.util
 import os
-import numpy as np
-from PIL import Image
-import face_recognition
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import detectors
+import tracing
+from tracing import span
+from cache import DetectionCache, DEFAULT_MAX_BYTES
+from boxes import scale_box, offset_box, expand_box, merge_boxes, tile_grid
 
 MODEL_TYPE = 'hog'  # or 'cnn' for GPU acceleration
+FACE_UPSAMPLE = 1
+PLATE_SCALE_FACTOR = 1.1
+PLATE_MIN_NEIGHBORS = 4
+PLATE_MIN_SIZE = (30, 30)
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+# OpenCV, NumPy and PIL are imported by the functions that use them, and the
+# models are built on first use (see detectors.py), so importing this module or
+# running --help stays fast. Call warm_up() to pay for both ahead of time.
+
+# Per-detector resolution settings.
+#   max_size: detect on a copy whose longest side is at most this many pixels (0 = full size)
+#   margin:   grow boxes mapped back from the small copy by this fraction of their size
+#   refine:   re-run the detector at full resolution around each candidate box
+#   context:  how far around a candidate the refine pass looks, as a fraction of its size
+#   tile_size: split the image into tiles of this many pixels and detect them in parallel (0 = off)
+#   overlap:  pixels shared by neighbouring tiles, should exceed the largest expected object
+#   workers:  processes used for tiles (0 = CPU count)
+DETECTION_OPTIONS = {
+    'face': {'max_size': 0, 'margin': 0.15, 'refine': False, 'context': 1.0,
+             'tile_size': 0, 'overlap': 256, 'workers': 0},
+    'plate': {'max_size': 0, 'margin': 0.1, 'refine': False, 'context': 0.5,
+              'tile_size': 0, 'overlap': 192, 'workers': 0},
+}
+
+# Worker pool shared by tiled detections in this process. Its workers are not
+# forked from us: the GUI has other threads running (a model warm-up among
+# them) and a child forked while one holds a lock, detectors._lock say, would
+# wait on it forever
+TILE_POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+# Seconds between looks at the cancel event while waiting for a tile
+CANCEL_POLL_INTERVAL = 0.1
+_tile_pool = None
+_tile_pool_workers = 0
+_tile_pool_finalizer = None
+
+# On-disk detection cache, off until enable_cache() is called
+_cache = None
+
+# Known faces left unblurred, off until enable_allow_list() is called
+_allow_list = None
+_allow_list_tolerance = None
+
+def configure_detection(detector, **options):
+    """Update the default resolution settings for 'face' or 'plate' detection."""
+    unknown = set(options) - set(DETECTION_OPTIONS[detector])
+    if unknown:
+        raise ValueError(f"Unknown {detector} detection option(s): {', '.join(sorted(unknown))}")
+    DETECTION_OPTIONS[detector].update(options)
+
+def enable_cache(directory=None, max_bytes=DEFAULT_MAX_BYTES):
+    """Cache find_faces/find_plates results on disk (see cache.py)."""
+    global _cache
+    _cache = DetectionCache(directory, max_bytes)
+    return _cache
+
+def disable_cache():
+    global _cache
+    _cache = None
+
+def get_cache():
+    return _cache
+
+def enable_allow_list(path, tolerance=None):
+    """Leave the faces in the allow-list file at `path` unblurred (see allowlist.py)."""
+    global _allow_list, _allow_list_tolerance
+    import allowlist
+    _allow_list = allowlist.AllowList.load(path)
+    _allow_list_tolerance = allowlist.DEFAULT_TOLERANCE if tolerance is None else tolerance
+    return _allow_list
+
+def disable_allow_list():
+    global _allow_list
+    _allow_list = None
+
+def known_faces(image, face_coords):
+    """Name of each face in the allow-list, or None; all None while no list is enabled."""
+    if _allow_list is None:
+        return [None] * len(face_coords)
+    with span("allow_list", faces=len(face_coords), known=len(_allow_list)):
+        return _allow_list.known(image, face_coords, _allow_list_tolerance)
+
+def load_image_file(image_path):
+    import numpy as np
+    from PIL import Image
+
+    # Same decoding face_recognition.load_image_file does, without importing it
+    with span("decode", path=image_path):
+        return np.array(Image.open(image_path).convert('RGB'))
+
+def face_locations(image, upsample=FACE_UPSAMPLE, model=MODEL_TYPE):
+    """Return (top, right, bottom, left) face locations using the cached dlib detector."""
+    detector = detectors.get("face_" + model)
+    with span(model, size=f"{image.shape[1]}x{image.shape[0]}"):
+        rects = detector(image, upsample)
+    if model == 'cnn':
+        rects = [d.rect for d in rects]
+
+    # Clamp to the image like face_recognition does
+    height, width = image.shape[:2]
+    return [(max(r.top(), 0), min(r.right(), width), min(r.bottom(), height), max(r.left(), 0))
+            for r in rects]
+
+class DetectionCancelled(Exception):
+    """Raised by find_faces and find_plates when their cancel event gets set."""
+
+def _checkpoint(progress, cancel, done, total):
+    # Called between units of work (tiles, refine windows)
+    if cancel is not None and cancel.is_set():
+        raise DetectionCancelled()
+    if progress is not None:
+        progress(done, total)
+
+def _detection_options(detector, overrides):
+    unknown = set(overrides) - set(DETECTION_OPTIONS[detector])
+    if unknown:
+        raise TypeError(f"Unknown {detector} detection option(s): {', '.join(sorted(unknown))}")
+    options = dict(DETECTION_OPTIONS[detector])
+    options.update({k: v for k, v in overrides.items() if v is not None})
+    return options
+
+def _get_tile_pool(workers):
+    """The shared tile pool with `workers` processes, kept across images."""
+    global _tile_pool, _tile_pool_workers, _tile_pool_finalizer
+    if _tile_pool is None or _tile_pool_workers != workers:
+        shutdown_tile_pool()
+        _tile_pool = ProcessPoolExecutor(max_workers=workers,
+                                         mp_context=multiprocessing.get_context(TILE_POOL_START_METHOD))
+        _tile_pool_workers = workers
+    # Registered once per process; a forked child starts with an empty registry
+    if _tile_pool_finalizer is None or not _tile_pool_finalizer.still_active():
+        # Inside a batch worker, multiprocessing joins our tile workers on exit
+        # before atexit would stop them, so shut the pool down first. Above the
+        # queues' own finalizers (10), which would close the feeder thread that
+        # has to deliver the shutdown messages.
+        _tile_pool_finalizer = multiprocessing.util.Finalize(None, shutdown_tile_pool, exitpriority=20)
+    return _tile_pool
+
+def shutdown_tile_pool():
+    """Stop the worker processes used for tiled detection."""
+    global _tile_pool, _tile_pool_workers
+    if _tile_pool is not None:
+        _tile_pool.shutdown(cancel_futures=True)
+        _tile_pool = None
+        _tile_pool_workers = 0
+
+def _detect_tiled(detect, image, options, progress=None, cancel=None):
+    """Run `detect` over overlapping tiles in parallel and merge boxes along the seams."""
+    height, width = image.shape[:2]
+    tile_size = options['tile_size']
+    if not tile_size or (width <= tile_size and height <= tile_size):
+        _checkpoint(progress, cancel, 0, 1)
+        boxes = detect(image)
+        _checkpoint(progress, cancel, 1, 1)
+        return boxes
+
+    import numpy as np
+    tiles = tile_grid(width, height, tile_size, min(options['overlap'], tile_size // 2))
+    workers = options['workers'] or os.cpu_count() or 1
+    _checkpoint(progress, cancel, 0, len(tiles))
+
+    boxes = []
+    if workers == 1 or len(tiles) == 1:
+        for done, (left, top, right, bottom) in enumerate(tiles, 1):
+            with span("tile", box=(left, top, right, bottom)):
+                found = detect(np.ascontiguousarray(image[top:bottom, left:right]))
+            boxes.extend(offset_box(b, left, top) for b in found)
+            _checkpoint(progress, cancel, done, len(tiles))
+    else:
+        pool = _get_tile_pool(workers)
+        traced = tracing.is_enabled()
+        futures = []
+        for (left, top, right, bottom) in tiles:
+            tile = np.ascontiguousarray(image[top:bottom, left:right])
+            # When tracing, the workers send their spans back along with the boxes
+            future = pool.submit(tracing.call, detect, tile) if traced else pool.submit(detect, tile)
+            futures.append((left, top, future))
+        try:
+            for done, (left, top, future) in enumerate(futures, 1):
+                while True:
+                    try:
+                        found = future.result(timeout=CANCEL_POLL_INTERVAL if cancel is not None else None)
+                        break
+                    except TimeoutError:
+                        _checkpoint(None, cancel, done - 1, len(tiles))
+                if traced:
+                    found, events = found
+                    tracing.add_events(events)
+                boxes.extend(offset_box(b, left, top) for b in found)
+                _checkpoint(progress, cancel, done, len(tiles))
+        except DetectionCancelled:
+            # Drop the tiles that have not started yet
+            for _, _, future in futures:
+                future.cancel()
+            raise
+
+    with span("merge", boxes=len(boxes)):
+        return merge_boxes(boxes)
+
+def _detect_scaled(detect, image, options, progress=None, cancel=None):
+    """Run `detect` on a downscaled copy of `image` and map the boxes back."""
+    import cv2
+    import numpy as np
+
+    height, width = image.shape[:2]
+    max_size = options['max_size']
+    scale = min(1.0, max_size / float(max(height, width))) if max_size else 1.0
+    if scale >= 1.0:
+        return _detect_tiled(detect, image, options, progress, cancel)
+
+    with span("downscale", scale=round(scale, 3)):
+        small = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    candidates = [expand_box(scale_box(box, 1.0 / scale), options['margin'], width, height)
+                  for box in _detect_tiled(detect, small, options, progress, cancel)]
+    if not options['refine']:
+        return candidates
+
+    # Look again at full resolution around each candidate, which also picks up
+    # small faces next to the ones found on the small copy
+    refined = []
+    for done, box in enumerate(candidates, 1):
+        (left, top), (right, bottom) = expand_box(box, options['context'], width, height)
+        with span("refine", box=(left, top, right, bottom)):
+            found = detect(np.ascontiguousarray(image[top:bottom, left:right]))
+        if found:
+            refined.extend(offset_box(b, left, top) for b in found)
+        else:
+            refined.append(box)
+        _checkpoint(progress, cancel, done, len(candidates))
+    return merge_boxes(refined)
+
+# Module-level so tiles can be sent to worker processes
+def _detect_faces(pixels):
+    locations = face_locations(pixels, model=MODEL_TYPE)
+    return [((left, top), (right, bottom)) for (top, right, bottom, left) in locations]
+
+def _detect_plates(pixels):
+    # Pretrained OpenCV cascade for license plate detection, loaded once per process
+    plate_cascade = detectors.get("plate")
+
+    # Detect license plates
+    with span("cascade", size=f"{pixels.shape[1]}x{pixels.shape[0]}"):
+        plates = plate_cascade.detectMultiScale(pixels, scaleFactor=PLATE_SCALE_FACTOR,
+                                                minNeighbors=PLATE_MIN_NEIGHBORS, minSize=PLATE_MIN_SIZE)
+    return [((int(x), int(y)), (int(x+w), int(y+h))) for (x, y, w, h) in plates]
+
+def _detect_cached(detect, detector, image, options, params, progress, cancel):
+    """Run _detect_scaled, going through the detection cache when it is enabled."""
+    if _cache is None:
+        return _detect_scaled(detect, image, options, progress, cancel)
+
+    # Everything that changes the boxes goes into the key, the worker count does not
+    settings = {k: v for k, v in options.items() if k != 'workers'}
+    with span("cache_lookup", detector=detector):
+        key = _cache.key(image, detector, dict(settings, **params))
+        boxes = _cache.get(key)
+    if boxes is not None:
+        _checkpoint(progress, cancel, 1, 1)
+        return boxes
+
+    boxes = _detect_scaled(detect, image, options, progress, cancel)
+    with span("cache_store", detector=detector):
+        _cache.put(key, boxes)
+    return boxes
+
+def find_faces(image, progress=None, cancel=None, **options):
+    """Return face boxes as ((left, top), (right, bottom)) for an already decoded RGB array.
+
+    Keyword options override DETECTION_OPTIONS['face'] for this call.
+    `progress(done, total)` is called after each tile or refine window, and
+    DetectionCancelled is raised at the next one once `cancel` (an Event) is set.
+    """
+    params = {'model': MODEL_TYPE, 'upsample': FACE_UPSAMPLE}
+    with span("find_faces"):
+        return _detect_cached(_detect_faces, 'face', image, _detection_options('face', options),
+                              params, progress, cancel)
+
+def find_plates(image, progress=None, cancel=None, **options):
+    """Return plate boxes as ((left, top), (right, bottom)) for a BGR or grayscale array.
+
+    Takes the same options, `progress` and `cancel` as find_faces.
+    """
+    import cv2
+    with span("find_plates"):
+        with span("to_gray"):
+            gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        params = {'scale_factor': PLATE_SCALE_FACTOR, 'min_neighbors': PLATE_MIN_NEIGHBORS,
+                  'min_size': list(PLATE_MIN_SIZE)}
+        return _detect_cached(_detect_plates, 'plate', gray, _detection_options('plate', options),
+                              params, progress, cancel)
 
 def faces_boxes(image_path):
     print("Looking for faces in:", image_path)
     
-    image = face_recognition.load_image_file(image_path)
+    image = load_image_file(image_path)
+    return _faces_boxes(image)
+
+def _faces_boxes(image):
+    import cv2
 
     # Detect face locations
-    face_locations = face_recognition.face_locations(image, model=MODEL_TYPE)
+    boxes = find_faces(image)
 
-    print("Found", len(face_locations), "face(s)")
+    print("Found", len(boxes), "face(s)")
 
     # Convert to OpenCV image
-    image_cv = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    with span("to_bgr"):
+        image_cv = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
 
     # Draw boxes around faces
-    boxes = []
-    for (top, right, bottom, left) in face_locations:
-        boxes.append(((left, top), (right, bottom)))
-        cv2.rectangle(image_cv, (left, top), (right, bottom), (0, 255, 0), 2)
+    with span("draw_boxes", boxes=len(boxes)):
+        for (top_left, bottom_right) in boxes:
+            cv2.rectangle(image_cv, top_left, bottom_right, (0, 255, 0), 2)
 
     return image_cv, boxes
 
 def plates_boxes(image_cv):
+    import cv2
     print("Looking for license plates")
 
-    gray = cv2.cvtColor(image_cv, cv2.COLOR_BGR2GRAY)
+    boxes = find_plates(image_cv)
 
-    # Load pretrained OpenCV cascade for license plate detection
-    plate_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_russian_plate_number.xml')
-
-    # Detect license plates
-    plates = plate_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4, minSize=(30,30))
-
-    print("Found", len(plates), "plate(s)")
+    print("Found", len(boxes), "plate(s)")
 
     # Using coords, draw boxes around plates
-    boxes = []
-    for (x, y, w, h) in plates:
-        boxes.append(((x, y), (x+w, y+h)))
-        cv2.rectangle(image_cv, (x, y), (x+w, y+h), (255, 0, 0), 2)
+    with span("draw_boxes", boxes=len(boxes)):
+        for (top_left, bottom_right) in boxes:
+            cv2.rectangle(image_cv, top_left, bottom_right, (255, 0, 0), 2)
 
     return image_cv, boxes
 
 # Resize image for better display
+@tracing.traced("resize")
 def resize_image(image, width):
+    import cv2
     aspect_ratio = image.shape[1] / image.shape[0]
     new_height = int(width / aspect_ratio)
     resized_image = cv2.resize(image, (width, new_height))
     return resized_image
 
+@tracing.traced("blur")
 def blur_faces(image_cv, face_coords, blur_strength=50):
+    import cv2
     for (top_left, bottom_right) in face_coords:
         (left, top) = top_left
         (right, bottom) = bottom_right
@@ -64,21 +365,288 @@ def blur_faces(image_cv, face_coords, blur_strength=50):
         image_cv[top:bottom, left:right] = blurred_face
     return image_cv
 
-def main():
-    IMG_PATH = os.path.join(os.getcwd(), "images", "2.jpg")
+def numbered_path(path, taken):
+    """`path`, or the first of name_1.ext, name_2.ext, ... next to it, for which taken() is false."""
+    stem, extension = os.path.splitext(path)
+    candidate, n = path, 1
+    while taken(candidate):
+        candidate = f"{stem}_{n}{extension}"
+        n += 1
+    return candidate
+
+def collect_images(inputs, output_dir):
+    """Expand files, directories and glob patterns into (input, output) path pairs."""
+    jobs = []
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            # Keep the directory layout under the output directory
+            for root, _, files in os.walk(item):
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        src = os.path.join(root, name)
+                        rel = os.path.relpath(src, item)
+                        jobs.append((src, os.path.join(output_dir, rel)))
+        else:
+            matches = sorted(glob.glob(item)) if glob.has_magic(item) else [item]
+            for src in matches:
+                if os.path.isfile(src) and src.lower().endswith(IMAGE_EXTENSIONS):
+                    jobs.append((src, os.path.join(output_dir, os.path.basename(src))))
 
-    faces_img, face_coords = faces_boxes(IMG_PATH)
+    # Drop duplicates when the same file is matched by several inputs
+    unique = []
+    for src, dst in jobs:
+        key = os.path.abspath(src)
+        if key not in seen:
+            seen.add(key)
+            unique.append((src, dst))
+
+    # Different files can still map to one output (photo.jpg from two folders),
+    # the later ones get a numbered name instead of overwriting the first
+    taken = set()
+    for i, (src, dst) in enumerate(unique):
+        candidate = numbered_path(dst, lambda path: os.path.normcase(path) in taken)
+        if candidate != dst:
+            print(f"Warning: {dst} is already the output of another input, writing {src} to {candidate}")
+            unique[i] = (src, candidate)
+        taken.add(os.path.normcase(candidate))
+    return unique
+
+def redact_image(image, width=800, blur_strength=200):
+    """Run the redaction pipeline on an RGB array.
+
+    Returns the BGR result and the face and plate boxes found.
+    """
+    faces_img, face_coords = _faces_boxes(image)
     output_image, plate_coords = plates_boxes(faces_img)
 
-    output_image = blur_faces(output_image, face_coords, 200)
+    # Faces on the allow-list stay as they are
+    names = known_faces(image, face_coords)
+    if any(names):
+        print("Kept", sum(1 for name in names if name), "known face(s):", ", ".join(sorted({n for n in names if n})))
+    bystanders = [box for box, name in zip(face_coords, names) if name is None]
+    output_image = blur_faces(output_image, bystanders, blur_strength)
+
+    if width:
+        output_image = resize_image(output_image, width)
+    return output_image, face_coords, plate_coords
+
+def process_image(in_path, out_path, width=800, blur_strength=200):
+    """Run the full redaction pipeline on one image and write the result."""
+    import cv2
+    start = time.perf_counter()
+
+    with span("process_image", path=in_path):
+        print("Looking for faces in:", in_path)
+        output_image, face_coords, plate_coords = redact_image(load_image_file(in_path), width, blur_strength)
+
+        # Save the output image
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        with span("imwrite", path=out_path):
+            if not cv2.imwrite(out_path, output_image):
+                raise IOError(f"Could not write {out_path}")
+
+    return len(face_coords), len(plate_coords), time.perf_counter() - start
+
+def _run_job(job):
+    in_path, out_path, width, blur_strength = job
+    try:
+        return in_path, out_path, process_image(in_path, out_path, width, blur_strength), None
+    except Exception as e:
+        return in_path, out_path, None, str(e)
+
+def warm_up(names=None):
+    """Import the image libraries and build the detectors (face and plate by default) now.
+
+    Returns the seconds each step took: 'import' plus one entry per detector.
+    """
+    start = time.perf_counter()
+    with span("import"):
+        import cv2  # noqa: F401
+        import numpy  # noqa: F401
+        from PIL import Image  # noqa: F401
+    times = {'import': time.perf_counter() - start}
+    with span("warm_up"):
+        if names is None:
+            names = ["face_" + MODEL_TYPE, "plate"]
+            if _allow_list is not None:
+                names += ["face_landmarks", "face_encoder"]
+        detectors.warm_up(names)
+    load_times = detectors.load_times()
+    times.update((name, load_times[name]) for name in names)
+    return times
+
+def format_times(times):
+    return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in times.items())
+
+def _init_worker(detection_options=None, cache_options=None, allow_list_options=None):
+    for detector, options in (detection_options or {}).items():
+        configure_detection(detector, **options)
+    if cache_options is not None:
+        enable_cache(**cache_options)
+    if allow_list_options is not None:
+        enable_allow_list(**allow_list_options)
+
+    # Build the models once per worker instead of on its first image
+    times = warm_up()
+    print(f"Ready in process {os.getpid()}: {format_times(times)}")
+
+def _init_warm_worker(ready, *initargs):
+    _init_worker(*initargs)
+    ready.put(os.getpid())
+
+def warm_pool(workers, detection_options=None, cache_options=None, allow_list_options=None):
+    """A process pool whose workers have all built their models by the time it is returned.
+
+    For long-running services; raises BrokenProcessPool if a worker fails to start.
+    """
+    context = multiprocessing.get_context()
+    ready = context.Queue()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_warm_worker,
+                               initargs=(ready, detection_options, cache_options, allow_list_options))
+    # Workers start as jobs arrive, one job each makes sure all of them do. Which
+    # worker runs which job does not matter, each reports in once its initializer is done.
+    futures = [pool.submit(os.getpid) for _ in range(workers)]
+    started = 0
+    while started < workers:
+        try:
+            ready.get(timeout=0.5)
+            started += 1
+        except queue.Empty:
+            for future in futures:
+                if future.done() and future.exception() is not None:
+                    pool.shutdown(cancel_futures=True)
+                    raise future.exception()
+    return pool
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Batch redact faces and license plates in images.")
+    parser.add_argument("inputs", nargs="*", default=[os.path.join(os.getcwd(), "images", "2.jpg")],
+                        help="image files, directories or glob patterns (default: images/2.jpg)")
+    parser.add_argument("-o", "--output", default=os.path.join(os.getcwd(), "output"),
+                        help="output directory (default: output/)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--width", type=int, default=800,
+                        help="resize results to this width, 0 keeps the original size (default: 800)")
+    parser.add_argument("--blur", type=int, default=200,
+                        help="blur kernel size used on faces (default: 200)")
+    parser.add_argument("--face-max-size", type=int, default=0,
+                        help="detect faces on a copy at most this many pixels on its longest side (default: full size)")
+    parser.add_argument("--plate-max-size", type=int, default=0,
+                        help="detect plates on a copy at most this many pixels on its longest side (default: full size)")
+    parser.add_argument("--margin", type=float, default=None,
+                        help="grow boxes found on a reduced copy by this fraction of their size")
+    parser.add_argument("--refine", action="store_true",
+                        help="re-check candidates found on a reduced copy at full resolution")
+    parser.add_argument("--tile-size", type=int, default=0,
+                        help="detect on overlapping tiles of this many pixels in parallel (default: off)")
+    parser.add_argument("--tile-workers", type=int, default=0,
+                        help="processes used per image for tiles (default: CPU count divided by workers)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="where to cache detection results (default: $BLANKIT_CACHE_DIR or ~/.cache/blankit/detections)")
+    parser.add_argument("--cache-size", type=int, default=64,
+                        help="maximum detection cache size in MB (default: 64)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always run detection, ignoring cached results")
+    parser.add_argument("--allow-list", metavar="PATH", default=None,
+                        help="leave the faces in this list unblurred (build one with allowlist.py)")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="how close a face must be to a listed one to count as known, lower is stricter (default: 0.6)")
+    parser.add_argument("--trace", metavar="PATH", default=None,
+                        help="write a Chrome trace of every stage to PATH (also: $BLANKIT_TRACE)")
+    return parser.parse_args(argv)
+
+def allow_list_options(args):
+    """_init_worker arguments for --allow-list and --tolerance, checking the file once up front.
+
+    Raises ValueError when the list can not be read.
+    """
+    if not args.allow_list:
+        return None
+    import allowlist
+    try:
+        known = len(allowlist.AllowList.load(args.allow_list))
+    except (OSError, ValueError, KeyError) as e:
+        raise ValueError(f"Could not read allow-list {args.allow_list}: {e}")
+    print(f"Allow-list: {known} known face(s) left unblurred")
+    return {'path': args.allow_list, 'tolerance': args.tolerance}
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.trace:
+        tracing.enable(args.trace)
+
+    jobs = collect_images(args.inputs, args.output)
+    if not jobs:
+        print("No images found")
+        return 1
+    try:
+        allow_list = allow_list_options(args)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    workers = max(1, min(args.workers, len(jobs)))
+    print(f"Processing {len(jobs)} image(s) with {workers} worker(s)")
+
+    # Every batch worker gets its own tile pool, share the cores between them
+    tile_workers = args.tile_workers or max(1, (os.cpu_count() or 1) // workers)
+    detection_options = {}
+    for detector, max_size in (('face', args.face_max_size), ('plate', args.plate_max_size)):
+        detection_options[detector] = {'max_size': max_size, 'refine': args.refine,
+                                       'tile_size': args.tile_size, 'workers': tile_workers}
+        if args.margin is not None:
+            detection_options[detector]['margin'] = args.margin
+
+    cache_options = None
+    if not args.no_cache:
+        cache_options = {'directory': args.cache_dir, 'max_bytes': args.cache_size * 1024 * 1024}
+
+    tasks = [(src, dst, args.width, args.blur) for src, dst in jobs]
+    failed = 0
+    start = time.perf_counter()
+
+    def report(result):
+        nonlocal failed
+        in_path, out_path, stats, error = result
+        if error is not None:
+            failed += 1
+            print(f"FAILED {in_path}: {error}")
+            return
+        faces, plates, elapsed = stats
+        print(f"{in_path} -> {out_path}: {faces} face(s), {plates} plate(s) in {elapsed:.2f}s")
 
-    resized = resize_image(output_image, 800)
+    if workers == 1:
+        # Run in-process, no need to pay for a pool
+        _init_worker(detection_options, cache_options, allow_list)
+        for task in tasks:
+            report(_run_job(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(detection_options, cache_options, allow_list)) as pool:
+            if tracing.is_enabled():
+                futures = {pool.submit(tracing.call, _run_job, task): task for task in tasks}
+            else:
+                futures = {pool.submit(_run_job, task): task for task in tasks}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    # A worker died (killed, out of memory, a crash in native code) and
+                    # took the images still queued with it, count them as failed
+                    in_path, out_path = futures[future][:2]
+                    report((in_path, out_path, None, f"worker process died ({e})"))
+                    continue
+                if tracing.is_enabled():
+                    result, events = result
+                    tracing.add_events(events)
+                report(result)
 
-    # Save the output image
-    output_path = os.path.join(os.getcwd(), "output", "result.jpg")
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    cv2.imwrite(output_path, resized)
-    print(f"Result saved to: {output_path}")
+    total = time.perf_counter() - start
+    done = len(tasks) - failed
+    print(f"Done: {done}/{len(tasks)} image(s) in {total:.2f}s ({done / total if total else 0:.2f} images/sec)")
+    return 1 if failed else 0
 
 if __name__ == "__main__": # If this program is run directly
-    main()
\ No newline at end of file
+    raise SystemExit(main())
@@ -0,0 +1,346 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import main
+import tracing
+
+# Localhost only: the service has no authentication
+HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_TIMEOUT = 120
+# Latencies kept per endpoint for the percentiles in /metrics
+LATENCY_WINDOW = 1000
+ENCODINGS = {"png": (".png", "image/png"), "jpg": (".jpg", "image/jpeg"), "jpeg": (".jpg", "image/jpeg")}
+
+class BadRequest(Exception):
+    """The request can not be processed as sent, answered with 400."""
+
+class ServiceUnavailable(Exception):
+    """The worker pool could not run the request, answered with 503."""
+
+# ---------- worker side ----------
+def _decode(data):
+    import cv2
+    import numpy as np
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise BadRequest("body is not an image OpenCV can decode")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+def _redact_job(data, width, blur_strength, extension):
+    import cv2
+    image = _decode(data)
+    output_image, faces, plates = main.redact_image(image, width, blur_strength)
+    ok, encoded = cv2.imencode(extension, output_image)
+    if not ok:
+        raise RuntimeError(f"could not encode the result as {extension}")
+    return encoded.tobytes(), len(faces), len(plates)
+
+def _boxes_job(data):
+    import cv2
+    image = _decode(data)
+    faces = main.find_faces(image)
+    plates = main.find_plates(cv2.cvtColor(image, cv2.COLOR_RGB2GRAY))
+    height, width = image.shape[:2]
+    return {
+        "width": width,
+        "height": height,
+        "faces": [[left, top, right, bottom] for (left, top), (right, bottom) in faces],
+        # Names from the allow-list, null for everyone else
+        "known": main.known_faces(image, faces),
+        "plates": [[left, top, right, bottom] for (left, top), (right, bottom) in plates],
+    }
+
+# ---------- server side ----------
+class Metrics:
+    """Request counts and recent latencies per endpoint, safe to update from handler threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)  # (endpoint, status) -> requests
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self.started = time.time()
+
+    def record(self, endpoint, status, seconds):
+        with self._lock:
+            self._counts[(endpoint, status)] += 1
+            if status == 200:
+                self._latencies[endpoint].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {}
+            for (endpoint, status), count in self._counts.items():
+                entry = endpoints.setdefault(endpoint, {"requests": {}, "latency_ms": {}})
+                entry["requests"][str(status)] = count
+            for endpoint, window in self._latencies.items():
+                times = sorted(window)
+                if times:
+                    endpoints[endpoint]["latency_ms"] = {
+                        name: round(times[min(len(times) - 1, int(fraction * len(times)))] * 1000, 2)
+                        for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+                    }
+                    endpoints[endpoint]["latency_ms"]["max"] = round(times[-1] * 1000, 2)
+        return {"uptime_s": round(time.time() - self.started, 1), "endpoints": endpoints}
+
+class RedactionService:
+    """A warm worker pool behind a bounded queue.
+
+    At most workers + queue_size images are accepted at once (running plus
+    waiting). Handlers take a slot with reserve() before reading the upload,
+    so a full server answers 429 without receiving the image first.
+    """
+
+    def __init__(self, workers, queue_size, detection_options=None, cache_options=None, allow_list_options=None):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._replace_lock = threading.Lock()
+        self._in_flight = 0
+        self._pool_args = (workers, detection_options, cache_options, allow_list_options)
+        self.pool = main.warm_pool(*self._pool_args)
+        self.restarts = 0
+
+    def reserve(self):
+        """Take a slot for one image, False when the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self._in_flight += 1
+        return True
+
+    def release(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def run(self, fn, *args, timeout=None):
+        """Run fn(*args) in a worker for a request holding a reserve()d slot.
+
+        The slot is given back once the job is done, even if the caller stopped
+        waiting for it. When a worker has died, the pool is replaced and the
+        job tried once more before ServiceUnavailable is raised.
+        """
+        holding = True
+        try:
+            for _ in range(2):
+                pool = self.pool
+                try:
+                    future = pool.submit(tracing.call, fn, *args) if tracing.is_enabled() else pool.submit(fn, *args)
+                except BrokenProcessPool:
+                    self._replace(pool)
+                    continue
+                holding = False
+                future.add_done_callback(self.release)
+                try:
+                    result = future.result(timeout)
+                except BrokenProcessPool:
+                    # The broken job gave its slot back, the retry needs one again
+                    self._replace(pool)
+                    holding = self.reserve()
+                    if not holding:
+                        break
+                    continue
+                if tracing.is_enabled():
+                    result, events = result
+                    tracing.add_events(events)
+                return result
+            raise ServiceUnavailable("the worker processes stopped, try again shortly")
+        finally:
+            if holding:
+                self.release()
+
+    def _replace(self, broken):
+        """Swap in a new pool for `broken`, unless another request already did."""
+        with self._replace_lock:
+            if self.pool is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            print("A worker process died, restarting the pool")
+            try:
+                self.pool = main.warm_pool(*self._pool_args)
+                self.restarts += 1
+            except BrokenProcessPool as e:
+                print(f"Could not restart the workers: {e}")
+
+    def queue_depth(self):
+        with self._lock:
+            in_flight = self._in_flight
+        return {"in_flight": in_flight, "queued": max(0, in_flight - self.workers),
+                "workers": self.workers, "capacity": self.capacity, "restarts": self.restarts}
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+class RedactionHandler(BaseHTTPRequestHandler):
+    server_version = "BlankIt"
+    # Set by serve()
+    service = None
+    metrics = None
+    options = None
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/metrics":
+            body = dict(self.metrics.snapshot(), queue=self.service.queue_depth())
+            self._send_json(200, body)
+        elif path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"unknown path {path}"})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        if url.path not in ("/redact", "/boxes"):
+            self._send_json(404, {"error": f"unknown path {url.path}"})
+            return
+        try:
+            status = self._handle(url.path, parse_qs(url.query))
+        except BadRequest as e:
+            # The body may not have been read, so the connection can not be reused
+            self.close_connection = True
+            status = self._send_json(400, {"error": str(e)})
+        except ServiceUnavailable as e:
+            status = self._send_json(503, {"error": str(e)}, {"Retry-After": "5"})
+        except TimeoutError:
+            status = self._send_json(504, {"error": "processing took too long"})
+        except Exception as e:
+            status = self._send_json(500, {"error": str(e)})
+        self.metrics.record(url.path, status, time.perf_counter() - start)
+
+    def _handle(self, path, query):
+        # Everything that can be refused is checked before the upload is read,
+        # the connection is closed instead of draining a body we do not want
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise BadRequest("Content-Length must be an integer")
+        if length <= 0:
+            raise BadRequest("send the image bytes as the request body")
+        if length > self.options["max_bytes"]:
+            self.close_connection = True
+            return self._send_json(413, {"error": f"images are limited to {self.options['max_bytes']} bytes"})
+
+        if path == "/boxes":
+            job = (_boxes_job,)
+        else:
+            width = _int_param(query, "width", 0)
+            blur_strength = _int_param(query, "blur", self.options["blur"])
+            encoding = query.get("format", ["png"])[0].lower()
+            if encoding not in ENCODINGS:
+                raise BadRequest(f"format must be one of: {', '.join(ENCODINGS)}")
+            extension, content_type = ENCODINGS[encoding]
+            job = (_redact_job, width, blur_strength, extension)
+
+        if not self.service.reserve():
+            self.close_connection = True
+            return self._send_json(429, {"error": "too many images in progress, retry later"},
+                                   {"Retry-After": "1"})
+        try:
+            data = self.rfile.read(length)
+        except BaseException:
+            self.service.release()
+            raise
+        fn, *params = job
+        result = self.service.run(fn, data, *params, timeout=self.options["timeout"])
+        if path == "/boxes":
+            return self._send_json(200, result)
+        encoded, faces, plates = result
+        return self._send(200, encoded, content_type, {"X-Faces": str(faces), "X-Plates": str(plates)})
+
+    def _send_json(self, status, body, headers=None):
+        return self._send(status, json.dumps(body).encode(), "application/json", headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        return status
+
+    def log_message(self, format, *args):
+        # Per-request lines would drown the workers' output, /metrics has the numbers
+        pass
+
+def _int_param(query, name, default):
+    try:
+        value = int(query[name][0]) if name in query else default
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+    if value < 0:
+        raise BadRequest(f"{name} must not be negative")
+    return value
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve BlankIt redaction over HTTP on localhost.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"port to listen on at {HOST} (default: {DEFAULT_PORT})")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"images allowed to wait for a worker before answering 429 (default: {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES,
+                        help="largest accepted request body (default: 50 MB)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"seconds to wait for a result before answering 504 (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument("--blur", type=int, default=200,
+                        help="default blur kernel size used on faces (default: 200)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="where to cache detection results (default: $BLANKIT_CACHE_DIR or ~/.cache/blankit/detections)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always run detection, ignoring cached results")
+    parser.add_argument("--allow-list", metavar="PATH", default=None,
+                        help="leave the faces in this list unblurred (build one with allowlist.py)")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="how close a face must be to a listed one to count as known, lower is stricter (default: 0.6)")
+    parser.add_argument("--trace", metavar="PATH", default=None,
+                        help="write a Chrome trace of every stage to PATH on exit (also: $BLANKIT_TRACE)")
+    return parser.parse_args(argv)
+
+def serve(args):
+    if args.trace:
+        tracing.enable(args.trace)
+    cache_options = None if args.no_cache else {'directory': args.cache_dir}
+    try:
+        allow_list = main.allow_list_options(args)
+    except ValueError as e:
+        print(e)
+        return 1
+    workers = max(1, args.workers)
+    print(f"Starting {workers} worker(s)")
+    start = time.perf_counter()
+    service = RedactionService(workers, max(0, args.queue_size), cache_options=cache_options,
+                               allow_list_options=allow_list)
+    print(f"Workers ready in {time.perf_counter() - start:.2f}s")
+
+    RedactionHandler.service = service
+    RedactionHandler.metrics = Metrics()
+    RedactionHandler.options = {"max_bytes": args.max_bytes, "timeout": args.timeout, "blur": args.blur}
+    httpd = ThreadingHTTPServer((HOST, args.port), RedactionHandler)
+    httpd.daemon_threads = True
+    print(f"Listening on http://{HOST}:{httpd.server_address[1]}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(serve(parse_args()))
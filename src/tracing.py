@@ -0,0 +1,154 @@
+import atexit
+import functools
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+
+# Set BLANKIT_TRACE to a file name to record a trace of every run, or use --trace.
+# The output is Chrome trace-event JSON: open it in https://ui.perfetto.dev or chrome://tracing.
+ENV_VAR = "BLANKIT_TRACE"
+# Spans kept in memory, about 300 bytes each. A long-running watch folder or
+# service keeps the latest ones and drops the oldest
+MAX_EVENTS = 200_000
+
+_enabled = False
+_path = None
+_events = deque(maxlen=MAX_EVENTS)
+_thread_names = {}  # (pid, tid) -> thread name
+
+def enable(path=None):
+    """Start recording spans. With a path, the trace is written there when the main process exits."""
+    global _enabled, _path
+    _enabled = True
+    if path:
+        _path = path
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    return _enabled
+
+def _now_us():
+    # perf_counter is a system-wide monotonic clock, so worker timestamps line up with ours
+    return time.perf_counter_ns() // 1000
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, *exc):
+        end = _now_us()
+        pid, tid = os.getpid(), threading.get_native_id()
+        if (pid, tid) not in _thread_names:
+            _thread_names[(pid, tid)] = threading.current_thread().name
+        event = {"name": self.name, "ph": "X", "ts": self.start, "dur": end - self.start,
+                 "pid": pid, "tid": tid}
+        if self.args:
+            event["args"] = self.args
+        _events.append(event)
+        return False
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def span(name, /, **args):
+    """Context manager timing one stage. Costs one flag check when tracing is off."""
+    if not _enabled:
+        return _NO_SPAN
+    return _Span(name, {k: str(v) for k, v in args.items()})
+
+def traced(name=None):
+    """Decorator form of span()."""
+    def decorate(fn):
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def call(fn, *args):
+    """Run fn(*args) in a pool worker with tracing on and return (result, events).
+
+    Submit this instead of fn so the spans recorded in the worker since its
+    last call (nested pools included) come back with the result; pass the
+    events to add_events() in the parent. Spans from the pool initializer are
+    only among them if tracing was already on when it ran, that is when the
+    worker was forked from a tracing parent or BLANKIT_TRACE is set.
+    """
+    global _enabled
+    was_enabled, _enabled = _enabled, True
+    try:
+        result = fn(*args)
+    finally:
+        _enabled = was_enabled
+    # One copy first: other threads may still be appending while we look
+    events = list(_events)
+    threads = {(e["pid"], e["tid"]) for e in events}
+    events += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                "args": {"name": _thread_names.get((pid, tid), "")}}
+               for pid, tid in threads]
+    _events.clear()
+    return result, events
+
+def add_events(events):
+    """Merge spans recorded in another process."""
+    for event in events:
+        if event["ph"] == "M":
+            _thread_names[(event["pid"], event["tid"])] = event["args"]["name"]
+        else:
+            _events.append(event)
+
+def write(path=None):
+    """Write everything recorded so far as a Chrome trace. Returns the path, or None if nothing to write."""
+    path = path or _path
+    events = list(_events)
+    if not path or not events:
+        return None
+    main_pid = os.getpid()
+    threads = {(e["pid"], e["tid"]) for e in events}
+    metadata = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                 "args": {"name": "blankit" if pid == main_pid else f"worker {pid}"}}
+                for pid in sorted({pid for pid, _ in threads})]
+    metadata += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                  "args": {"name": _thread_names.get((pid, tid), "")}}
+                 for pid, tid in sorted(threads)]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+    return path
+
+def _write_at_exit():
+    # Pool workers inherit the environment, only the main process writes the file
+    if multiprocessing.parent_process() is None:
+        path = write()
+        if path:
+            print(f"Trace written to: {path}")
+
+def _forget_parent_events():
+    # A forked worker starts with a copy of the parent's spans, they are not its to send
+    _events.clear()
+
+if os.environ.get(ENV_VAR):
+    enable(os.environ[ENV_VAR])
+atexit.register(_write_at_exit)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_parent_events)
@@ -0,0 +1,133 @@
+import argparse
+import time
+import cv2
+import numpy as np
+from main import find_faces, find_plates, blur_faces, configure_detection
+from boxes import merge_boxes
+
+# Optical flow settings used to carry boxes between keyframes
+FEATURE_PARAMS = dict(maxCorners=20, qualityLevel=0.01, minDistance=3, blockSize=7)
+FLOW_PARAMS = dict(winSize=(21, 21), maxLevel=3,
+                   criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+def clamp_boxes(boxes, width, height):
+    """Clip boxes to the frame and drop the ones that end up empty."""
+    clamped = []
+    for (left, top), (right, bottom) in boxes:
+        left, top = max(0, int(left)), max(0, int(top))
+        right, bottom = min(width, int(right)), min(height, int(bottom))
+        if right > left and bottom > top:
+            clamped.append(((left, top), (right, bottom)))
+    return clamped
+
+def track_boxes(prev_gray, gray, boxes):
+    """Move each box by the median optical flow of the corners found inside it."""
+    height, width = gray.shape[:2]
+    moved = []
+    for (left, top), (right, bottom) in boxes:
+        # Corners are searched in a view of the box, then moved to frame coordinates
+        points = cv2.goodFeaturesToTrack(prev_gray[top:bottom, left:right], **FEATURE_PARAMS)
+        if points is None:
+            # Nothing to follow, keep the box where it was
+            moved.append(((left, top), (right, bottom)))
+            continue
+        points += np.float32([left, top])
+
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, **FLOW_PARAMS)
+        good = status.reshape(-1) == 1
+        if not good.any():
+            moved.append(((left, top), (right, bottom)))
+            continue
+
+        dx, dy = np.median((new_points - points).reshape(-1, 2)[good], axis=0)
+        dx, dy = int(round(dx)), int(round(dy))
+        moved.append(((left + dx, top + dy), (right + dx, bottom + dy)))
+    return clamp_boxes(moved, width, height)
+
+def detect_frame(frame):
+    """Run face and plate detection on one BGR frame."""
+    faces = find_faces(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    plates = find_plates(frame)
+    return faces + plates
+
+def redact_video(in_path, out_path, every=10, blur_strength=200, fourcc="mp4v"):
+    """Blur faces and plates in a video, detecting every `every` frames and tracking in between."""
+    capture = cv2.VideoCapture(in_path)
+    if not capture.isOpened():
+        raise IOError(f"Could not open {in_path}")
+
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    if not writer.isOpened():
+        capture.release()
+        raise IOError(f"Could not write {out_path}")
+
+    frames = 0
+    keyframes = 0
+    boxes = []    # found at the last keyframe, tracked since
+    carried = []  # lost by the detector at the last keyframe, tracked one more interval
+    prev_gray = None
+    start = time.perf_counter()
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+            if frames % every == 0:
+                detected = clamp_boxes(detect_frame(frame), width, height)
+                # A face the detector misses for a moment (turned away, motion blur)
+                # stays blurred until the next keyframe; one it misses twice is dropped
+                found = len(merge_boxes(detected))
+                carried = [box for box in boxes if len(merge_boxes(detected + [box])) > found]
+                boxes = detected
+                keyframes += 1
+            else:
+                boxes = track_boxes(prev_gray, gray, boxes)
+                carried = track_boxes(prev_gray, gray, carried)
+
+            writer.write(blur_faces(frame, merge_boxes(boxes + carried), blur_strength))
+            prev_gray = gray
+            frames += 1
+
+            if frames % 100 == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{frames} frame(s), {frames / elapsed:.1f} fps")
+    finally:
+        capture.release()
+        writer.release()
+
+    return frames, keyframes, time.perf_counter() - start
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Redact faces and license plates in a video file.")
+    parser.add_argument("input", help="input video")
+    parser.add_argument("output", help="output video")
+    parser.add_argument("--every", type=int, default=10,
+                        help="run full detection every N frames and track boxes in between (default: 10)")
+    parser.add_argument("--blur", type=int, default=200,
+                        help="blur kernel size (default: 200)")
+    parser.add_argument("--fourcc", default="mp4v",
+                        help="output codec (default: mp4v)")
+    parser.add_argument("--face-max-size", type=int, default=0,
+                        help="detect faces on a copy at most this many pixels on its longest side (default: full size)")
+    parser.add_argument("--plate-max-size", type=int, default=0,
+                        help="detect plates on a copy at most this many pixels on its longest side (default: full size)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_detection('face', max_size=args.face_max_size)
+    configure_detection('plate', max_size=args.plate_max_size)
+
+    frames, keyframes, elapsed = redact_video(args.input, args.output, max(1, args.every), args.blur, args.fourcc)
+    print(f"Done: {frames} frame(s), {keyframes} keyframe(s) in {elapsed:.2f}s "
+          f"({frames / elapsed if elapsed else 0:.1f} fps)")
+    print(f"Result saved to: {args.output}")
+    return 0
+
+if __name__ == "__main__": # If this program is run directly
+    raise SystemExit(main())
@@ -0,0 +1,257 @@
+import argparse
+import os
+import shutil
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+import main
+import tracing
+
+DEFAULT_INTERVAL = 0.5
+DEFAULT_SETTLE = 1.0
+# Jobs handed to the pool per worker, the rest wait here so a burst of files
+# does not turn into thousands of pickled jobs in the pool's queue
+JOBS_PER_WORKER = 2
+# Times a file is retried, on its own, after a worker died while redacting it.
+# A file that keeps crashing workers goes to the failed directory after that
+CRASH_RETRIES = 2
+
+class StabilityTracker:
+    """Tells which files in a directory are complete.
+
+    A file counts as complete once its size and modification time have not
+    changed for `settle` seconds, so copies still in progress are left alone.
+    Names starting with '.' or '~' are skipped (usual for temporary files), as
+    are files without an image extension.
+    """
+
+    def __init__(self, settle):
+        self.settle = settle
+        self._seen = {}  # name -> ((size, mtime_ns), unchanged since, first seen)
+
+    def scan(self, directory, now, skip=()):
+        """Return (name, first seen) for each file that became complete since the last scan."""
+        ready = []
+        present = set()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if name in skip or name.startswith((".", "~")) or not name.lower().endswith(main.IMAGE_EXTENSIONS):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue  # removed while we looked
+                present.add(name)
+                signature = (stat.st_size, stat.st_mtime_ns)
+                previous = self._seen.get(name)
+                if previous is None or previous[0] != signature:
+                    first_seen = previous[2] if previous else now
+                    self._seen[name] = (signature, now, first_seen)
+                elif stat.st_size > 0 and now - previous[1] >= self.settle:
+                    ready.append((name, previous[2]))
+                    del self._seen[name]
+        for name in set(self._seen) - present:
+            del self._seen[name]
+        ready.sort(key=lambda item: item[1])
+        return ready
+
+def _process(in_path, out_path, width, blur_strength):
+    """Redact one file, publishing the result with a single rename."""
+    directory, name = os.path.split(out_path)
+    extension = os.path.splitext(name)[1]
+    # Hidden and with the real extension, so cv2 picks the encoder and watchers of
+    # the output directory never see a half-written file
+    tmp = os.path.join(directory, f".{name}.{os.getpid()}.partial{extension}")
+    try:
+        stats = main.process_image(in_path, tmp, width, blur_strength)
+        os.replace(tmp, out_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return stats
+
+def _move(path, directory):
+    """Move a finished original out of the inbox. Returns False if it had to stay.
+
+    A rename, so atomic, when both are on one filesystem; otherwise a copy and
+    delete. An earlier file of the same name keeps its place, this one gets a
+    numbered name as in main.collect_images.
+    """
+    try:
+        shutil.move(path, main.numbered_path(os.path.join(directory, os.path.basename(path)), os.path.exists))
+        return True
+    except OSError as e:
+        print(f"Could not move {path} to {directory}, it will be left alone until restart: {e}")
+        return False
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Watch a directory and redact every image that arrives in it.")
+    parser.add_argument("inbox", help="directory to watch")
+    parser.add_argument("-o", "--output", default=os.path.join(os.getcwd(), "output"),
+                        help="where redacted images are written (default: output/)")
+    parser.add_argument("--processed", default=None,
+                        help="where originals go once redacted (default: INBOX/processed)")
+    parser.add_argument("--failed", default=None,
+                        help="where originals go when they can not be processed (default: INBOX/failed)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help=f"seconds between directory scans (default: {DEFAULT_INTERVAL})")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE,
+                        help=f"seconds a file must stay unchanged before it is picked up (default: {DEFAULT_SETTLE})")
+    parser.add_argument("--width", type=int, default=800,
+                        help="resize results to this width, 0 keeps the original size (default: 800)")
+    parser.add_argument("--blur", type=int, default=200,
+                        help="blur kernel size used on faces (default: 200)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="where to cache detection results (default: $BLANKIT_CACHE_DIR or ~/.cache/blankit/detections)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always run detection, ignoring cached results")
+    parser.add_argument("--allow-list", metavar="PATH", default=None,
+                        help="leave the faces in this list unblurred (build one with allowlist.py)")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="how close a face must be to a listed one to count as known, lower is stricter (default: 0.6)")
+    parser.add_argument("--trace", metavar="PATH", default=None,
+                        help="write a Chrome trace of every stage to PATH on exit (also: $BLANKIT_TRACE)")
+    return parser.parse_args(argv)
+
+def watch(args, stop=None):
+    """Process files arriving in args.inbox until `stop` (an Event) is set or SIGINT/SIGTERM."""
+    if args.trace:
+        tracing.enable(args.trace)
+    inbox = os.path.abspath(args.inbox)
+    processed = args.processed or os.path.join(inbox, "processed")
+    failed = args.failed or os.path.join(inbox, "failed")
+    for directory in (args.output, processed, failed):
+        os.makedirs(directory, exist_ok=True)
+
+    if stop is None:
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+    try:
+        allow_list = main.allow_list_options(args)
+    except ValueError as e:
+        print(e)
+        return 1
+    workers = max(1, args.workers)
+    cache_options = None if args.no_cache else {'directory': args.cache_dir}
+    # Build the models in every worker now, not when the first file lands
+    pool = main.warm_pool(workers, None, cache_options, allow_list)
+    print(f"Watching {inbox} with {workers} worker(s)")
+
+    tracker = StabilityTracker(args.settle)
+    waiting = deque()  # (name, first seen), oldest first
+    running = {}       # future -> (name, first seen, output path)
+    stuck = set()      # names that are done but could not be moved out, never queued again
+    crashes = {}       # name -> times a worker died while redacting it
+    counts = {"done": 0, "failed": 0}
+    next_scan = 0.0
+    traced = tracing.is_enabled()
+
+    def fail(in_path, reason):
+        counts["failed"] += 1
+        print(f"FAILED {in_path}: {reason}")
+        if not _move(in_path, failed):
+            stuck.add(os.path.basename(in_path))
+
+    def finish(future):
+        """Handle a finished job. Returns True if its worker died and the pool is broken."""
+        name, first_seen, out_path = running.pop(future)
+        in_path = os.path.join(inbox, name)
+        try:
+            result = future.result()
+            if traced:
+                result, events = result
+                tracing.add_events(events)
+        except BrokenProcessPool as e:
+            # Every job in the pool fails with the one that crashed it
+            if os.path.exists(out_path):
+                counts["done"] += 1
+                if not _move(in_path, processed):
+                    stuck.add(name)
+                print(f"{in_path} -> {out_path}: written before its worker died")
+            elif crashes.get(name, 0) < CRASH_RETRIES:
+                crashes[name] = crashes.get(name, 0) + 1
+                waiting.appendleft((name, first_seen))
+            else:
+                crashes.pop(name, None)
+                fail(in_path, f"worker died {CRASH_RETRIES + 1} times ({e})")
+            return True
+        except Exception as e:
+            fail(in_path, e)
+            return False
+        crashes.pop(name, None)
+        counts["done"] += 1
+        faces, plates, elapsed = result
+        if not _move(in_path, processed):
+            stuck.add(name)
+        print(f"{in_path} -> {out_path}: {faces} face(s), {plates} plate(s) "
+              f"in {elapsed:.2f}s, {time.monotonic() - first_seen:.2f}s after arrival "
+              f"({len(waiting) + len(running)} waiting)")
+        return False
+
+    def restart():
+        """Collect the jobs of a pool whose worker died, then start a new one."""
+        nonlocal pool
+        print("A worker died, restarting the pool")
+        pool.shutdown(wait=True)
+        for future in list(running):
+            finish(future)
+        pool = main.warm_pool(workers, None, cache_options, allow_list)
+
+    try:
+        while not stop.is_set():
+            now = time.monotonic()
+            if now >= next_scan:
+                claimed = stuck | {name for name, _ in waiting} | {name for name, _, _ in running.values()}
+                waiting.extend(tracker.scan(inbox, now, claimed))
+                next_scan = now + args.interval
+
+            while waiting and len(running) < workers * JOBS_PER_WORKER:
+                name, first_seen = waiting[0]
+                # Files retried after a crash run on their own, so the next crash is
+                # only held against the file that caused it
+                if running and (name in crashes or any(n in crashes for n, _, _ in running.values())):
+                    break
+                waiting.popleft()
+                # A file named like an earlier one gets a numbered output instead of replacing it
+                reserved = {out for _, _, out in running.values()}
+                out_path = main.numbered_path(os.path.join(args.output, name),
+                                              lambda path: path in reserved or os.path.exists(path))
+                job = (os.path.join(inbox, name), out_path, args.width, args.blur)
+                try:
+                    future = pool.submit(tracing.call, _process, *job) if traced else pool.submit(_process, *job)
+                except BrokenProcessPool:
+                    waiting.appendleft((name, first_seen))
+                    restart()
+                    continue
+                running[future] = (name, first_seen, out_path)
+
+            # Wake up for the next scan, or as soon as a job finishes so the pool stays fed
+            if not running:
+                stop.wait(max(0.0, next_scan - time.monotonic()))
+                continue
+            finished, _ = wait(running, timeout=max(0.0, next_scan - time.monotonic()),
+                               return_when=FIRST_COMPLETED)
+            if any([finish(future) for future in finished]):
+                restart()
+    finally:
+        # Files already being redacted are finished and moved, the rest stay
+        # in the inbox for the next run
+        pool.shutdown(wait=True, cancel_futures=True)
+        for future in [f for f in running if not f.cancelled()]:
+            finish(future)
+        print(f"Stopped: {counts['done']} image(s) redacted, {counts['failed']} failed")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(watch(parse_args()))